@@ -1,6 +1,13 @@
+import os
 import pygame
 import sys
-import copy
+import time
+from collections import deque
+
+from motor_xadrez import Jogo, Peca, BuscaEmSegundoPlano, EstatisticasBusca, MEMORIA_TT_PADRAO_MB
+from livro_aberturas import LivroAberturas, LIVRO_PADRAO
+from tabelas_finais import TabelasFinais
+from pgn_xadrez import partida_pgn
 
 # Inicialização do Pygame
 pygame.init()
@@ -12,6 +19,19 @@ LARGURA_JANELA = 1000  # Aumentada para acomodar a área de informações
 ALTURA_JANELA = 640
 TAMANHO_QUADRADO = LARGURA_TABULEIRO // 8
 
+# Orçamento de reflexão da IA por lance (segundos; nós é opcional)
+TEMPO_POR_LANCE = 2.0
+NOS_POR_LANCE = None
+# Durante a vez do jogador a IA já pensa na posição depois da resposta que ela prevê
+PONDERAR = True
+# Arquivo onde a tecla S acrescenta a partida em PGN
+ARQUIVO_PARTIDAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'partidas.pgn')
+# Com um caminho, as estatísticas de cada busca da IA são acrescentadas a ele em JSON Lines
+ARQUIVO_ESTATISTICAS = None
+# Limite de quadros por segundo: o relógio do laço principal dorme o resto de cada quadro em vez
+# de girar sem parar enquanto espera o clique
+QUADROS_POR_SEGUNDO = 30
+
 # Cores
 BRANCO = (255, 255, 255)
 PRETO = (0, 0, 0)
@@ -48,214 +68,130 @@ else:
 # Fontes adicionais para a área de informações e legenda
 FONTE_INFO = pygame.font.SysFont(None, 24)
 FONTE_LEGENDA = pygame.font.SysFont(None, 30)
-
-# Mapeamento dos símbolos Unicode das peças
-SIMBOLOS_PECAS = {
-    'rei_azul': '\u2654',     # ♔
-    'rainha_azul': '\u2655',  # ♕
-    'torre_azul': '\u2656',   # ♖
-    'bispo_azul': '\u2657',   # ♗
-    'cavalo_azul': '\u2658',  # ♘
-    'peao_azul': '\u2659',    # ♙
-    'rei_vermelho': '\u265A',     # ♚
-    'rainha_vermelho': '\u265B',  # ♛
-    'torre_vermelho': '\u265C',   # ♜
-    'bispo_vermelho': '\u265D',   # ♝
-    'cavalo_vermelho': '\u265E',  # ♞
-    'peao_vermelho': '\u265F',    # ♟
-}
-
-# Classe para representar uma peça
-class Peca:
-    def __init__(self, tipo, cor):
-        self.tipo = tipo  # 'rei', 'rainha', 'bispo', 'cavalo', 'torre', 'peao'
-        self.cor = cor    # 'azul' ou 'vermelho'
-        self.simbolo = SIMBOLOS_PECAS[f'{tipo}_{cor}']
-        self.movimentos_realizados = 0  # Para roque e en passant
-
-    def movimentos_validos(self, x, y, tabuleiro, roque_disponivel):
-        movimentos = []
-        direcoes = []
-
-        if self.tipo == 'peao':
-            direcao = -1 if self.cor == 'azul' else 1
-            # Movimento simples
-            novo_y = y + direcao
-            if 0 <= novo_y < 8:
-                if tabuleiro[novo_y][x] is None:
-                    movimentos.append((x, novo_y))
-                    # Movimento duplo no primeiro movimento
-                    if (self.cor == 'azul' and y == 6) or (self.cor == 'vermelho' and y == 1):
-                        novo_y2 = y + 2 * direcao
-                        if 0 <= novo_y2 < 8 and tabuleiro[novo_y2][x] is None:
-                            movimentos.append((x, novo_y2))
-                # Captura diagonal
-                for dx in [-1, 1]:
-                    novo_x = x + dx
-                    if 0 <= novo_x < 8:
-                        peca_destino = tabuleiro[novo_y][novo_x]
-                        if peca_destino and peca_destino.cor != self.cor:
-                            movimentos.append((novo_x, novo_y))
-                        # En Passant
-                        elif peca_destino is None:
-                            # Implementação simplificada, pode ser expandida com histórico de movimentos
-                            pass
-        elif self.tipo == 'torre':
-            # Movimentos horizontais e verticais
-            direcoes = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            for dx, dy in direcoes:
-                nx, ny = x + dx, y + dy
-                while 0 <= nx < 8 and 0 <= ny < 8:
-                    peca_destino = tabuleiro[ny][nx]
-                    if peca_destino is None:
-                        movimentos.append((nx, ny))
-                    elif peca_destino.cor != self.cor:
-                        movimentos.append((nx, ny))
-                        break
-                    else:
-                        break
-                    nx += dx
-                    ny += dy
-            # Roque
-            if self.movimentos_realizados == 0:
-                # Implementar condições de roque
-                pass
-        elif self.tipo == 'bispo':
-            # Movimentos diagonais
-            direcoes = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for dx, dy in direcoes:
-                nx, ny = x + dx, y + dy
-                while 0 <= nx < 8 and 0 <= ny < 8:
-                    peca_destino = tabuleiro[ny][nx]
-                    if peca_destino is None:
-                        movimentos.append((nx, ny))
-                    elif peca_destino.cor != self.cor:
-                        movimentos.append((nx, ny))
-                        break
-                    else:
-                        break
-                    nx += dx
-                    ny += dy
-        elif self.tipo == 'rainha':
-            # Combinação de torre e bispo
-            direcoes = [(-1, 0), (1, 0), (0, -1), (0, 1),
-                        (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            for dx, dy in direcoes:
-                nx, ny = x + dx, y + dy
-                while 0 <= nx < 8 and 0 <= ny < 8:
-                    peca_destino = tabuleiro[ny][nx]
-                    if peca_destino is None:
-                        movimentos.append((nx, ny))
-                    elif peca_destino.cor != self.cor:
-                        movimentos.append((nx, ny))
-                        break
-                    else:
-                        break
-                    nx += dx
-                    ny += dy
-        elif self.tipo == 'rei':
-            # Movimentos para todas as direções, mas apenas uma casa
-            direcoes = [(-1, -1), (-1, 0), (-1, 1),
-                        (0, -1),         (0, 1),
-                        (1, -1),  (1, 0),  (1, 1)]
-            for dx, dy in direcoes:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < 8 and 0 <= ny < 8:
-                    peca_destino = tabuleiro[ny][nx]
-                    if peca_destino is None or peca_destino.cor != self.cor:
-                        movimentos.append((nx, ny))
-            # Roque
-            if self.movimentos_realizados == 0:
-                # Implementar condições de roque
-                pass
-        elif self.tipo == 'cavalo':
-            # Movimentos em 'L'
-            movimentos_cavalo = [
-                (x + 1, y + 2), (x + 1, y - 2),
-                (x - 1, y + 2), (x - 1, y - 2),
-                (x + 2, y + 1), (x + 2, y - 1),
-                (x - 2, y + 1), (x - 2, y - 1)
-            ]
-            for nx, ny in movimentos_cavalo:
-                if 0 <= nx < 8 and 0 <= ny < 8:
-                    peca_destino = tabuleiro[ny][nx]
-                    if peca_destino is None or peca_destino.cor != self.cor:
-                        movimentos.append((nx, ny))
-        return movimentos
-
-# Classe para representar o estado do jogo
-class Jogo:
-    def __init__(self):
-        self.tabuleiro = [[None for _ in range(8)] for _ in range(8)]
-        self.jogador_atual = 'azul'
-        self.historico = []  # Lista para armazenar o histórico de movimentos
-        self.roque_disponivel = {
-            'azul': {'roque_menos': True, 'roque_mais': True},
-            'vermelho': {'roque_menos': True, 'roque_mais': True}
-        }
-        self.iniciar_tabuleiro()
-
-    def iniciar_tabuleiro(self):
-        # Peças azuis (jogador humano)
-        self.tabuleiro[6] = [Peca('peao', 'azul') for _ in range(8)]
-        self.tabuleiro[7][0] = Peca('torre', 'azul')
-        self.tabuleiro[7][1] = Peca('cavalo', 'azul')
-        self.tabuleiro[7][2] = Peca('bispo', 'azul')
-        self.tabuleiro[7][3] = Peca('rainha', 'azul')
-        self.tabuleiro[7][4] = Peca('rei', 'azul')
-        self.tabuleiro[7][5] = Peca('bispo', 'azul')
-        self.tabuleiro[7][6] = Peca('cavalo', 'azul')
-        self.tabuleiro[7][7] = Peca('torre', 'azul')
-
-        # Peças vermelhas (IA)
-        self.tabuleiro[1] = [Peca('peao', 'vermelho') for _ in range(8)]
-        self.tabuleiro[0][0] = Peca('torre', 'vermelho')
-        self.tabuleiro[0][1] = Peca('cavalo', 'vermelho')
-        self.tabuleiro[0][2] = Peca('bispo', 'vermelho')
-        self.tabuleiro[0][3] = Peca('rainha', 'vermelho')
-        self.tabuleiro[0][4] = Peca('rei', 'vermelho')
-        self.tabuleiro[0][5] = Peca('bispo', 'vermelho')
-        self.tabuleiro[0][6] = Peca('cavalo', 'vermelho')
-        self.tabuleiro[0][7] = Peca('torre', 'vermelho')
-
-    def desenhar_tabuleiro(self):
-        # Desenhar o tabuleiro
+FONTE_ESTATISTICAS = pygame.font.SysFont(None, 20)
+
+# Casas do tabuleiro desenhadas uma só vez: cada quadro copia daqui apenas as casas que mudaram
+FUNDO_TABULEIRO = pygame.Surface((LARGURA_TABULEIRO, ALTURA_TABULEIRO)).convert()
+for y in range(8):
+    for x in range(8):
+        FUNDO_TABULEIRO.fill(BRANCO if (x + y) % 2 == 0 else CINZA,
+                             (x * TAMANHO_QUADRADO, y * TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO))
+RETANGULO_PAINEL = pygame.Rect(LARGURA_TABULEIRO, 0, LARGURA_JANELA - LARGURA_TABULEIRO, ALTURA_JANELA)
+
+# Painel de histórico: até 25 entradas, cada uma quebrada em linhas de 20 pixels, entre o título e
+# as estatísticas da última busca da IA, logo acima da legenda. Os textos fixos são renderizados
+# uma vez só.
+HISTORICO_VISIVEL = 25
+ALTURA_LINHA_INFO = 20
+LINHAS_ESTATISTICAS = 3
+Y_ESTATISTICAS = ALTURA_TABULEIRO - 50 - LINHAS_ESTATISTICAS * ALTURA_LINHA_INFO
+LINHAS_PAINEL = (Y_ESTATISTICAS - 60) // ALTURA_LINHA_INFO
+TITULO_HISTORICO = FONTE_INFO.render('Histórico de Movimentos:', True, PRETO)
+LEGENDA_AUTOR = FONTE_LEGENDA.render('autor: Luiz Tiago Wilcke', True, AZUL_LEGENDA)
+
+# Símbolos das peças já renderizados, um por símbolo
+GLIFOS = {}
+
+
+def glifo(simbolo):
+    texto = GLIFOS.get(simbolo)
+    if texto is None:
+        texto = GLIFOS[simbolo] = FONTE_PECA.render(simbolo, True, PRETO)
+    return texto
+
+
+# Jogo com a interface gráfica: desenho do tabuleiro, painel de histórico e prompt de promoção
+class JogoGrafico(Jogo):
+    def __init__(self, memoria_tt_mb=MEMORIA_TT_PADRAO_MB):
+        # Linhas já renderizadas das últimas entradas do histórico (uma lista de superfícies por
+        # entrada); as mais antigas saem sozinhas da deque
+        self.linhas_historico = deque(maxlen=HISTORICO_VISIVEL)
+        self.linhas_estatisticas = []
+        super().__init__(memoria_tt_mb)
+        self.invalidar()
+
+    def registrar_historico(self, cor, descricao):
+        # A entrada é quebrada e renderizada uma vez, quando entra no histórico
+        super().registrar_historico(cor, descricao)
+        self.linhas_historico.append([FONTE_INFO.render(linha, True, AZUL if cor == 'azul' else VERMELHO)
+                                      for linha in self.dividir_texto(descricao, 300, FONTE_INFO)])
+
+    def mostrar_estatisticas(self, linhas):
+        # Estatísticas da última busca no painel (renderizadas uma vez, como o histórico)
+        self.linhas_estatisticas = [FONTE_ESTATISTICAS.render(linha, True, PRETO) for linha in linhas]
+        self.historico_desenhado = None
+
+    def carregar_fen(self, fen):
+        super().carregar_fen(fen)
+        self.linhas_historico.clear()
+        self.invalidar()
+
+    def invalidar(self):
+        # Esquece o que está na tela: o próximo quadro redesenha o tabuleiro e o painel inteiros
+        self.casas_desenhadas = [None] * 64  # (símbolo, destaque) de cada casa no último quadro
+        self.historico_desenhado = None  # Tamanho do histórico quando o painel foi desenhado
+
+    def desenhar_tabuleiro(self, selecionado=None):
+        # Redesenha só as casas cuja peça ou destaque mudou desde o último quadro e devolve os
+        # retângulos delas para o pygame.display.update
+        destinos = selecionado[2] if selecionado else ()
+        retangulos = []
         for y in range(8):
             for x in range(8):
-                cor = BRANCO if (x + y) % 2 == 0 else CINZA
-                pygame.draw.rect(tela, cor, (x * TAMANHO_QUADRADO, y * TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO))
                 peca = self.tabuleiro[y][x]
+                if selecionado and (x, y) == selecionado[:2]:
+                    destaque = AMARELO
+                elif (x, y) in destinos:
+                    destaque = VERDE
+                else:
+                    destaque = None
+                estado = (peca.simbolo if peca else None, destaque)
+                if self.casas_desenhadas[y * 8 + x] == estado:
+                    continue
+                self.casas_desenhadas[y * 8 + x] = estado
+                retangulo = pygame.Rect(x * TAMANHO_QUADRADO, y * TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO)
+                tela.blit(FUNDO_TABULEIRO, retangulo, retangulo)
                 if peca:
-                    # Desenhar o símbolo da peça
-                    texto = FONTE_PECA.render(peca.simbolo, True, PRETO)
-                    pos_texto = texto.get_rect(center=(x * TAMANHO_QUADRADO + TAMANHO_QUADRADO//2, y * TAMANHO_QUADRADO + TAMANHO_QUADRADO//2))
-                    tela.blit(texto, pos_texto)
+                    texto = glifo(peca.simbolo)
+                    tela.blit(texto, texto.get_rect(center=retangulo.center))
+                if destaque == AMARELO:
+                    pygame.draw.rect(tela, AMARELO, retangulo, 3)
+                elif destaque == VERDE:
+                    # Destacar movimentos possíveis
+                    pygame.draw.circle(tela, VERDE, retangulo.center, 10)
+                retangulos.append(retangulo)
+        return retangulos
 
     def desenhar_info(self):
-        # Desenhar a área de informações ao lado do tabuleiro
+        # Desenhar a área de informações ao lado do tabuleiro; ela só muda com o histórico, e
+        # devolve os retângulos redesenhados como desenhar_tabuleiro
+        if self.historico_desenhado == len(self.historico):
+            return []
+        self.historico_desenhado = len(self.historico)
+        tela.fill(BRANCO, RETANGULO_PAINEL)
         # Desenhar uma linha vertical separando o tabuleiro da área de informações
-        pygame.draw.line(tela, PRETO, (LARGURA_TABULEIRO, 0), (LARGURA_TABULEIRO, ALTURA_TABULEIRO), 2)
+        pygame.draw.line(tela, PRETO, (LARGURA_TABULEIRO + 1, 0), (LARGURA_TABULEIRO + 1, ALTURA_TABULEIRO), 2)
 
-        # Título
-        titulo = FONTE_INFO.render('Histórico de Movimentos:', True, PRETO)
-        tela.blit(titulo, (LARGURA_TABULEIRO + 20, 10))
+        tela.blit(TITULO_HISTORICO, (LARGURA_TABULEIRO + 20, 10))
 
-        # Exibir os movimentos
+        # Exibir os movimentos: as entradas mais recentes que couberem no painel, da mais antiga
+        # para a mais nova
+        linhas = []
+        for entrada in reversed(self.linhas_historico):
+            if len(linhas) + len(entrada) > LINHAS_PAINEL:
+                break
+            linhas[:0] = entrada
         y_offset = 40
-        for index, movimento in enumerate(self.historico[-25:]):  # Exibir apenas os últimos 25 movimentos
-            cor_jogador, descricao = movimento
-            # Dividir a descrição em múltiplas linhas se necessário
-            linhas = self.dividir_texto(descricao, 300, FONTE_INFO)
-            for linha in linhas:
-                texto = FONTE_INFO.render(linha, True, AZUL if cor_jogador == 'azul' else VERMELHO)
-                tela.blit(texto, (LARGURA_TABULEIRO + 20, y_offset))
-                y_offset += 20
-                if y_offset > ALTURA_TABULEIRO - 60:
-                    break  # Evita ultrapassar a área de informações
+        for texto in linhas:
+            tela.blit(texto, (LARGURA_TABULEIRO + 20, y_offset))
+            y_offset += ALTURA_LINHA_INFO
+
+        for indice, texto in enumerate(self.linhas_estatisticas):
+            tela.blit(texto, (LARGURA_TABULEIRO + 20, Y_ESTATISTICAS + indice * ALTURA_LINHA_INFO))
 
         # Legenda do Autor
-        legenda = FONTE_LEGENDA.render('autor: Luiz Tiago Wilcke', True, AZUL_LEGENDA)
-        tela.blit(legenda, (LARGURA_TABULEIRO + 20, ALTURA_TABULEIRO - 40))
+        tela.blit(LEGENDA_AUTOR, (LARGURA_TABULEIRO + 20, ALTURA_TABULEIRO - 40))
+        return [RETANGULO_PAINEL]
 
     def dividir_texto(self, texto, largura_max, fonte):
         # Função para dividir o texto em múltiplas linhas
@@ -274,37 +210,6 @@ class Jogo:
             linhas.append(linha_atual)
         return linhas
 
-    def mover_peca(self, origem, destino, is_ai_move=False, eval_score=None):
-        x1, y1 = origem
-        x2, y2 = destino
-        peca = self.tabuleiro[y1][x1]
-        destino_peca = self.tabuleiro[y2][x2]
-        self.tabuleiro[y2][x2] = peca
-        self.tabuleiro[y1][x1] = None
-        peca.movimentos_realizados += 1
-
-        # Promoção de peão
-        if peca.tipo == 'peao' and (y2 == 0 or y2 == 7):
-            self.promocao_peao(x2, y2, peca.cor)
-
-        # Atualizar roque disponibilidade
-        if peca.tipo == 'rei':
-            self.roque_disponivel[peca.cor]['roque_mais'] = False
-            self.roque_disponivel[peca.cor]['roque_menos'] = False
-        if peca.tipo == 'torre':
-            if x1 == 0:
-                self.roque_disponivel[peca.cor]['roque_menos'] = False
-            elif x1 == 7:
-                self.roque_disponivel[peca.cor]['roque_mais'] = False
-
-        # Adicionar movimento ao histórico
-        if is_ai_move:
-            descricao = f"IA move {peca.tipo.capitalize()} de ({x1},{y1}) para ({x2},{y2}) | Eval: {eval_score}"
-            self.historico.append(('vermelho', descricao))
-        else:
-            descricao = f"Jogador move {peca.tipo.capitalize()} de ({x1},{y1}) para ({x2},{y2})"
-            self.historico.append(('azul', descricao))
-
     def promocao_peao(self, x, y, cor):
         # Prompt para o jogador escolher a peça de promoção
         promovido = False
@@ -333,129 +238,79 @@ class Jogo:
                         promovido = True
                     if promovido:
                         self.tabuleiro[y][x] = nova_peca
-
-    def esta_em_xeque(self, cor):
-        # Verifica se o rei da cor especificada está em xeque
-        rei_pos = None
-        for y in range(8):
-            for x in range(8):
-                peca = self.tabuleiro[y][x]
-                if peca and peca.tipo == 'rei' and peca.cor == cor:
-                    rei_pos = (x, y)
-                    break
-            if rei_pos:
-                break
-
-        if not rei_pos:
-            return False  # Rei foi capturado
-
-        # Verifica se alguma peça adversária pode capturar o rei
-        cor_oponente = 'vermelho' if cor == 'azul' else 'azul'
-        for y in range(8):
-            for x in range(8):
-                peca = self.tabuleiro[y][x]
-                if peca and peca.cor == cor_oponente:
-                    movimentos = peca.movimentos_validos(x, y, self.tabuleiro, self.roque_disponivel)
-                    if rei_pos in movimentos:
-                        return True
-        return False
-
-    def esta_em_xeque_mate(self, cor):
-        if not self.esta_em_xeque(cor):
-            return False
-        # Verifica se há algum movimento que tira o rei do xeque
-        movimentos = self.obter_movimentos_validos(cor)
-        for movimento in movimentos:
-            copia_jogo = copy.deepcopy(self)
-            copia_jogo.mover_peca(*movimento)
-            if not copia_jogo.esta_em_xeque(cor):
-                return False
-        return True
-
-    def obter_movimentos_validos(self, cor):
-        movimentos = []
-        for y in range(8):
-            for x in range(8):
-                peca = self.tabuleiro[y][x]
-                if peca and peca.cor == cor:
-                    movimentos_possiveis = peca.movimentos_validos(x, y, self.tabuleiro, self.roque_disponivel)
-                    for destino in movimentos_possiveis:
-                        movimentos.append(((x, y), destino))
-        # Filtrar movimentos que não deixam o rei em xeque
-        movimentos_legais = []
-        for origem, destino in movimentos:
-            copia_jogo = copy.deepcopy(self)
-            copia_jogo.mover_peca(origem, destino)
-            if not copia_jogo.esta_em_xeque(cor):
-                movimentos_legais.append((origem, destino))
-        return movimentos_legais
-
-    def avaliar_tabuleiro(self):
-        # Função de avaliação para a IA
-        valor = 0
-        for y in range(8):
-            for x in range(8):
-                peca = self.tabuleiro[y][x]
-                if peca:
-                    if peca.cor == 'vermelho':
-                        valor += self.valor_peca(peca)
-                    else:
-                        valor -= self.valor_peca(peca)
-        return valor
-
-    def valor_peca(self, peca):
-        valores = {'peao': 10, 'cavalo': 30, 'bispo': 30, 'torre': 50, 'rainha': 90, 'rei': 900}
-        return valores.get(peca.tipo, 0)
-
-    def minimax(self, profundidade, maximizando, alpha=float('-inf'), beta=float('inf')):
-        cor = 'vermelho' if maximizando else 'azul'
-        if profundidade == 0 or self.esta_em_xeque_mate('azul') or self.esta_em_xeque_mate('vermelho'):
-            return self.avaliar_tabuleiro(), None
-
-        movimentos = self.obter_movimentos_validos(cor)
-        if not movimentos:
-            return self.avaliar_tabuleiro(), None
-
-        melhor_movimento = None
-
-        if maximizando:
-            max_eval = float('-inf')
-            for movimento in movimentos:
-                copia_jogo = copy.deepcopy(self)
-                copia_jogo.mover_peca(*movimento)
-                eval_atual, _ = copia_jogo.minimax(profundidade - 1, False, alpha, beta)
-                if eval_atual > max_eval:
-                    max_eval = eval_atual
-                    melhor_movimento = movimento
-                alpha = max(alpha, eval_atual)
-                if beta <= alpha:
-                    break
-            return max_eval, melhor_movimento
-        else:
-            min_eval = float('inf')
-            for movimento in movimentos:
-                copia_jogo = copy.deepcopy(self)
-                copia_jogo.mover_peca(*movimento)
-                eval_atual, _ = copia_jogo.minimax(profundidade - 1, True, alpha, beta)
-                if eval_atual < min_eval:
-                    min_eval = eval_atual
-                    melhor_movimento = movimento
-                beta = min(beta, eval_atual)
-                if beta <= alpha:
-                    break
-            return min_eval, melhor_movimento
-
-# Função principal do jogo
-def main():
-    jogo = Jogo()
+            pygame.time.wait(1000 // QUADROS_POR_SEGUNDO)
+        # O prompt cobriu a janela inteira
+        self.invalidar()
+
+
+def iniciar_ponderacao(busca, motor, movimento_ia):
+    # A variação principal da busca que escolheu o lance da IA traz a resposta esperada do
+    # jogador; o motor joga essa resposta e busca sem limite até o jogador mexer
+    variacao = motor.variacao_principal
+    if not PONDERAR or len(variacao) < 2 or variacao[0] != movimento_ia:
+        return None
+    motor.fazer_movimento(variacao[1])
+    if not motor._movimentos_legais(motor.lado):
+        motor.desfazer_movimento()
+        return None
+    busca.iniciar()
+    return variacao[1]
+
+
+def responder_jogada(busca, motor, jogada, previsto, inicio_ponderacao):
+    # Com a previsão certa a busca da ponderação continua, agora com o orçamento do lance
+    # contado desde o início da ponderação; senão ela é descartada e começa uma busca nova
+    if previsto == jogada:
+        busca.limitar(inicio_ponderacao + TEMPO_POR_LANCE, NOS_POR_LANCE)
+        return
+    if previsto is not None:
+        busca.cancelar()
+        motor.desfazer_movimento()
+    motor.fazer_movimento(jogada)
+    busca.iniciar(TEMPO_POR_LANCE, NOS_POR_LANCE)
+
+
+def salvar_partida(jogo):
+    # Acrescenta a partida em PGN ao arquivo de partidas e mostra a FEN da posição atual
+    if jogo.esta_em_xeque_mate(jogo.jogador_atual):
+        resultado = '0-1' if jogo.jogador_atual == 'azul' else '1-0'
+    else:
+        resultado = '*'
+    cabecalhos = {'Event': 'Jogo de Xadrez do Tiago', 'Date': time.strftime('%Y.%m.%d'),
+                  'White': 'Jogador', 'Black': 'IA'}
+    with open(ARQUIVO_PARTIDAS, 'a', encoding='utf-8') as arquivo:
+        arquivo.write(partida_pgn(jogo, cabecalhos, resultado) + '\n')
+    print(f'Partida salva em {ARQUIVO_PARTIDAS}; FEN: {jogo.gerar_fen()}')
+
+
+# Função principal do jogo; fen, quando dada, é a posição de partida (o jogador é sempre o azul)
+def main(fen=None):
+    jogo = JogoGrafico(memoria_tt_mb=1)
+    # O motor tem o seu próprio estado: a busca em segundo plano faz e desfaz movimentos nele
+    # enquanto a interface desenha e gera os movimentos do jogador a partir de jogo
+    motor = Jogo()
+    if fen:
+        jogo.carregar_fen(fen)
+        motor.carregar_fen(fen)
+    if os.path.exists(LIVRO_PADRAO):
+        motor.livro = LivroAberturas(LIVRO_PADRAO)  # Lances de abertura saem sem busca
+    finais = TabelasFinais()
+    if finais.tabelas:
+        motor.finais = finais  # Finais de poucas peças jogados com perfeição (ver tabelas_finais.py)
+    motor.estatisticas = EstatisticasBusca()
+    busca = BuscaEmSegundoPlano(motor)
+    if jogo.jogador_atual == 'vermelho':
+        busca.iniciar(TEMPO_POR_LANCE, NOS_POR_LANCE)  # Posição carregada com a IA para jogar
+    previsto = None  # Resposta do jogador que a IA está ponderando
+    inicio_ponderacao = 0
     selecionado = None
     rodando = True
     fim_de_jogo = False
+    relogio = pygame.time.Clock()
 
     while rodando:
-        jogo.desenhar_tabuleiro()
-        jogo.desenhar_info()  # Desenhar a área de informações
-        pygame.display.flip()
+        # Só as áreas que mudaram vão para a janela
+        pygame.display.update(jogo.desenhar_tabuleiro(selecionado) + jogo.desenhar_info())
 
         if fim_de_jogo:
             fonte_fim = pygame.font.SysFont(None, 50)
@@ -468,11 +323,29 @@ def main():
             continue
 
         if jogo.jogador_atual == 'vermelho':
-            # Turno da IA
-            eval_score, melhor_movimento = jogo.minimax(3, True)
+            # Turno da IA: a busca roda em outra thread e a janela segue respondendo
+            if busca.em_andamento():
+                for evento in pygame.event.get():
+                    if evento.type == pygame.QUIT:
+                        rodando = False
+                relogio.tick(QUADROS_POR_SEGUNDO)
+                continue
+            eval_score, melhor_movimento = busca.resultado
+            previsto = None
+            if motor.estatisticas.iteracoes:
+                # Lances de livro não têm busca e mantêm as estatísticas anteriores
+                jogo.mostrar_estatisticas(motor.estatisticas.resumo())
+                if ARQUIVO_ESTATISTICAS:
+                    with open(ARQUIVO_ESTATISTICAS, 'a', encoding='utf-8') as arquivo:
+                        motor.estatisticas.registrar_json(arquivo, fen=motor.gerar_fen())
             if melhor_movimento:
-                jogo.mover_peca(*melhor_movimento, is_ai_move=True, eval_score=eval_score)
+                jogo.mover_peca(*melhor_movimento, is_ai_move=True, eval_score=eval_score,
+                                variacao=motor.variacao_principal)
                 print(f"IA move de {melhor_movimento[0]} para {melhor_movimento[1]} | Eval: {eval_score}")
+                movimento_ia = jogo.pilha_desfazer[-1][0]
+                motor.fazer_movimento(movimento_ia)
+                previsto = iniciar_ponderacao(busca, motor, movimento_ia)
+                inicio_ponderacao = time.time()
             if jogo.esta_em_xeque_mate('azul'):
                 fim_de_jogo = True
             jogo.jogador_atual = 'azul'
@@ -481,6 +354,8 @@ def main():
         for evento in pygame.event.get():
             if evento.type == pygame.QUIT:
                 rodando = False
+            elif evento.type == pygame.KEYDOWN and evento.key == pygame.K_s:
+                salvar_partida(jogo)
             elif evento.type == pygame.MOUSEBUTTONDOWN:
                 x, y = pygame.mouse.get_pos()
                 if x >= LARGURA_TABULEIRO or y >= ALTURA_TABULEIRO:
@@ -491,6 +366,7 @@ def main():
                 if selecionado:
                     if (x, y) in selecionado[2]:
                         jogo.mover_peca((selecionado[0], selecionado[1]), (x, y))
+                        responder_jogada(busca, motor, jogo.pilha_desfazer[-1][0], previsto, inicio_ponderacao)
                         if jogo.esta_em_xeque_mate('vermelho'):
                             fim_de_jogo = True
                         jogo.jogador_atual = 'vermelho'
@@ -500,25 +376,19 @@ def main():
                 else:
                     peca = jogo.tabuleiro[y][x]
                     if peca and peca.cor == 'azul':
-                        movimentos = peca.movimentos_validos(x, y, jogo.tabuleiro, jogo.roque_disponivel)
                         movimentos_legais = []
-                        for mov in movimentos:
-                            copia_jogo = copy.deepcopy(jogo)
-                            copia_jogo.mover_peca((x, y), mov)
-                            if not copia_jogo.esta_em_xeque('azul'):
-                                movimentos_legais.append(mov)
+                        for movimento in jogo.obter_movimentos_validos('azul'):
+                            if movimento[0] == (x, y) and movimento[1] not in movimentos_legais:
+                                movimentos_legais.append(movimento[1])
                         if movimentos_legais:
+                            # O destaque da peça e dos destinos sai no próximo quadro
                             selecionado = (x, y, movimentos_legais)
-                            # Destacar movimentos possíveis
-                            jogo.desenhar_tabuleiro()
-                            jogo.desenhar_info()
-                            pygame.draw.rect(tela, AMARELO, (x*TAMANHO_QUADRADO, y*TAMANHO_QUADRADO, TAMANHO_QUADRADO, TAMANHO_QUADRADO), 3)
-                            for mov in movimentos_legais:
-                                pygame.draw.circle(tela, VERDE, (mov[0]*TAMANHO_QUADRADO + TAMANHO_QUADRADO//2, mov[1]*TAMANHO_QUADRADO + TAMANHO_QUADRADO//2), 10)
-                            pygame.display.flip()
+        relogio.tick(QUADROS_POR_SEGUNDO)
 
+    busca.cancelar()
     pygame.quit()
     sys.exit()
 
 if __name__ == '__main__':
-    main()
+    # python XadrezPython2.py [FEN]: começa da posição dada em vez da inicial
+    main(' '.join(sys.argv[1:]) or None)
@@ -0,0 +1,206 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import re
+import sys
+import time
+
+from motor_xadrez import Jogo, PROFUNDIDADE_MAXIMA, LIMIAR_MATE, VALOR_MATE, REI, codificar_movimento, movimento_uci
+from tabelas_finais import TabelasFinais
+
+# Análise em lote: cada posição de um arquivo EPD (ou FEN, uma por linha) é buscada por um
+# processo de um conjunto, com profundidade, tempo ou nós fixos, e o resultado sai linha a linha
+# em CSV ou JSON Lines, na ordem do arquivo. Posições com bm (ou am) contam como resolvidas
+# quando o lance escolhido é um dos melhores (e nenhum dos a evitar). Uma linha que não é uma
+# posição válida sai como registro com o campo erro, e o lote continua.
+
+MEMORIA_TT_MB = 16  # Tabela de transposição de cada processo, limpa a cada posição
+CAMPOS = ('linha', 'id', 'fen', 'lance', 'san', 'pontuacao', 'mate', 'profundidade', 'nos', 'tempo', 'nps',
+          'bm', 'am', 'resolvida', 'erro')
+# Operações do EPD: código seguido dos operandos até o ';' (que pode aparecer entre aspas)
+_OPERACAO = re.compile(r'\s*([A-Za-z]\w*)((?:\s+(?:"[^"]*"|[^\s;"]+))*)\s*;')
+
+
+def ler_posicao(linha):
+    # (FEN completa, operações) de uma linha EPD ou FEN; None para linhas vazias e comentários
+    linha = linha.strip()
+    if not linha or linha.startswith('#'):
+        return None
+    campos = linha.split(None, 4)
+    resto = campos[4] if len(campos) > 4 else ''
+    relogios = resto.split()[:2]
+    if len(relogios) == 2 and relogios[0].isdigit() and relogios[1].isdigit():
+        # FEN completa, com os relógios no lugar das operações
+        return ' '.join(campos[:4] + relogios), {}
+    operacoes = {}
+    for codigo, operandos in _OPERACAO.findall(resto):
+        operacoes[codigo] = [operando.strip('"') for operando in re.findall(r'"[^"]*"|\S+', operandos)]
+    meio_lances = operacoes.get('hmvc', ['0'])[0]
+    numero = operacoes.get('fmvn', ['1'])[0]
+    return ' '.join(campos[:4] + [meio_lances, numero]), operacoes
+
+
+def lances_da_posicao(jogo, textos):
+    # Lances codificados a partir de SAN (o padrão do EPD) ou de coordenadas; os que não são
+    # legais na posição ficam de fora
+    legais = {movimento_uci(movimento): movimento for movimento in jogo._movimentos_legais(jogo.lado)}
+    lances = set()
+    for texto in textos:
+        if texto in legais:
+            lances.add(legais[texto])
+            continue
+        try:
+            lances.add(jogo.movimento_san(texto))
+        except ValueError:
+            pass
+    return lances
+
+
+_processo = {}  # Jogo de cada processo, criado uma vez pelo inicializador do conjunto
+
+
+def _iniciar_processo(memoria_tt_mb, usar_finais):
+    jogo = Jogo(memoria_tt_mb=memoria_tt_mb)
+    if usar_finais:
+        finais = TabelasFinais()
+        jogo.finais = finais if finais.tabelas else None
+    _processo['jogo'] = jogo
+
+
+def carregar_posicao(jogo, fen):
+    # carregar_fen não valida a FEN: letras, fileiras e contadores errados viram exceções
+    # diferentes, e uma posição sem os dois reis só quebraria dentro da busca
+    try:
+        jogo.carregar_fen(fen)
+    except (KeyError, IndexError, ValueError) as erro:
+        raise ValueError(f'FEN inválida: {erro!r}') from erro
+    if any(jogo.bitboards[lado * 6 + REI].bit_count() != 1 for lado in (0, 1)):
+        raise ValueError('FEN sem um rei de cada cor')
+
+
+def registro_erro(numero, fen, operacoes, erro):
+    registro = dict.fromkeys(CAMPOS, '')
+    registro.update({'linha': numero, 'id': ' '.join(operacoes.get('id', [])), 'fen': fen, 'nos': 0, 'tempo': 0.0,
+                     'erro': str(erro)})
+    return registro
+
+
+def analisar(tarefa):
+    # Busca uma posição e devolve o registro de saída
+    numero, fen, operacoes, profundidade, tempo_limite, limite_nos = tarefa
+    jogo = _processo['jogo']
+    try:
+        carregar_posicao(jogo, fen)
+    except ValueError as erro:
+        return registro_erro(numero, fen, operacoes, erro)
+    jogo.tabela_transposicao.limpar()
+    melhores = lances_da_posicao(jogo, operacoes.get('bm', []))
+    evitar = lances_da_posicao(jogo, operacoes.get('am', []))
+    lado = jogo.lado
+    inicio = time.perf_counter()
+    pontuacao, movimento = jogo.busca_iterativa(tempo_limite, limite_nos, profundidade)
+    tempo = time.perf_counter() - inicio
+    # Pontuação do ponto de vista de quem joga (a busca devolve do ponto de vista do vermelho)
+    pontuacao = pontuacao if lado else -pontuacao
+    codigo = codificar_movimento(*movimento) if movimento else 0
+    mate = ''
+    if abs(pontuacao) > LIMIAR_MATE:
+        lances = (VALOR_MATE - abs(pontuacao) + 1) // 2
+        mate = lances if pontuacao > 0 else -lances
+    resolvida = ''
+    if melhores or evitar:
+        resolvida = int(bool(codigo) and (not melhores or codigo in melhores) and codigo not in evitar)
+    return {
+        'linha': numero,
+        'id': ' '.join(operacoes.get('id', [])),
+        'fen': fen,
+        'lance': movimento_uci(codigo) if codigo else '',
+        'san': jogo.san_movimento(codigo) if codigo else '',
+        'pontuacao': pontuacao,
+        'mate': mate,
+        'profundidade': len(jogo.nos_iteracoes),
+        'nos': jogo.nos,
+        'tempo': round(tempo, 4),
+        'nps': round(jogo.nos / tempo) if tempo else 0,
+        'bm': ' '.join(operacoes.get('bm', [])),
+        'am': ' '.join(operacoes.get('am', [])),
+        'resolvida': resolvida,
+        'erro': '',
+    }
+
+
+def tarefas(caminhos, profundidade, tempo_limite, limite_nos):
+    # Gerador: o arquivo é lido aos poucos, conforme os processos pedem posições
+    for caminho in caminhos:
+        with open(caminho, encoding='utf-8', errors='replace') as arquivo:
+            for numero, linha in enumerate(arquivo, 1):
+                posicao = ler_posicao(linha)
+                if posicao is not None:
+                    yield (numero, posicao[0], posicao[1], profundidade, tempo_limite, limite_nos)
+
+
+def analisar_arquivos(caminhos, saida, formato='csv', profundidade=None, tempo_limite=None, limite_nos=None,
+                      processos=None, memoria_tt_mb=MEMORIA_TT_MB, usar_finais=True):
+    # Escreve um registro por posição assim que ele fica pronto (na ordem do arquivo) e devolve o
+    # resumo: posições, resolvidas, posições com bm/am, erros, nós e tempo total
+    if profundidade is None and tempo_limite is None and limite_nos is None:
+        raise ValueError('Informe profundidade, tempo ou nós por posição')
+    escritor = None
+    if formato == 'csv':
+        escritor = csv.DictWriter(saida, CAMPOS)
+        escritor.writeheader()
+    resumo = {'posicoes': 0, 'com_solucao': 0, 'resolvidas': 0, 'erros': 0, 'nos': 0, 'tempo_busca': 0.0}
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(processos, _iniciar_processo, (memoria_tt_mb, usar_finais)) as conjunto:
+        for registro in conjunto.imap(analisar, tarefas(caminhos, profundidade or PROFUNDIDADE_MAXIMA,
+                                                        tempo_limite, limite_nos)):
+            if escritor is not None:
+                escritor.writerow(registro)
+            else:
+                saida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            saida.flush()
+            resumo['posicoes'] += 1
+            resumo['nos'] += registro['nos']
+            resumo['tempo_busca'] += registro['tempo']
+            if registro['erro']:
+                resumo['erros'] += 1
+            if registro['resolvida'] != '':
+                resumo['com_solucao'] += 1
+                resumo['resolvidas'] += registro['resolvida']
+    resumo['tempo'] = time.perf_counter() - inicio
+    return resumo
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(
+        description='Analisa em lote as posições de arquivos EPD/FEN com um conjunto de processos')
+    argumentos.add_argument('arquivos', nargs='+', help='arquivos EPD (ou FEN, uma posição por linha)')
+    argumentos.add_argument('-o', '--saida', help='arquivo de resultados (padrão: saída padrão)')
+    argumentos.add_argument('-f', '--formato', choices=('csv', 'json'), default='csv',
+                            help='CSV ou JSON Lines (um objeto por posição)')
+    argumentos.add_argument('-d', '--profundidade', type=int, help='profundidade fixa por posição')
+    argumentos.add_argument('-t', '--tempo', type=float, help='segundos por posição')
+    argumentos.add_argument('-n', '--nos', type=int, help='nós por posição')
+    argumentos.add_argument('-p', '--processos', type=int, default=None,
+                            help='processos do conjunto (padrão: um por núcleo)')
+    argumentos.add_argument('--hash', type=int, default=MEMORIA_TT_MB, help='MB de tabela de transposição por processo')
+    argumentos.add_argument('--sem-finais', action='store_true', help='não consulta as tabelas de finais')
+    opcoes = argumentos.parse_args()
+    if opcoes.profundidade is None and opcoes.tempo is None and opcoes.nos is None:
+        opcoes.profundidade = 4
+    saida = open(opcoes.saida, 'w', encoding='utf-8', newline='') if opcoes.saida else sys.stdout
+    resumo = analisar_arquivos(opcoes.arquivos, saida, opcoes.formato, opcoes.profundidade, opcoes.tempo,
+                               opcoes.nos, opcoes.processos, opcoes.hash, not opcoes.sem_finais)
+    if opcoes.saida:
+        saida.close()
+    # O resumo vai para a saída de erros para não misturar com os resultados
+    texto = f'{resumo["posicoes"]} posições em {resumo["tempo"]:.1f} s'
+    if resumo['com_solucao']:
+        texto += (f'; resolvidas {resumo["resolvidas"]}/{resumo["com_solucao"]} '
+                  f'({100 * resumo["resolvidas"] / resumo["com_solucao"]:.0f}%)')
+    if resumo['erros']:
+        texto += f'; {resumo["erros"]} com erro'
+    if resumo['tempo_busca']:
+        texto += f'; {resumo["nos"]} nós, {resumo["nos"] / resumo["tempo_busca"]:.0f} nós/s'
+    print(texto, file=sys.stderr)
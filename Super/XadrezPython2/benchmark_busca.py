@@ -0,0 +1,186 @@
+import argparse
+import time
+
+from motor_xadrez import Jogo, EstatisticasBusca, codificar_movimento, movimento_uci
+from busca_paralela import BuscaParalela
+
+# Conjunto fixo de posições para comparar versões da busca
+POSICOES_BENCHMARK = [
+    ('inicial', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'),
+    ('italiana', 'r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7'),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('dragao', 'r2q1rk1/pp2ppbp/2np1np1/8/3NP3/2N1BP2/PPPQ2PP/R3KB1R w KQ - 3 10'),
+    ('meio-jogo', '4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19'),
+    ('final de torres', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1'),
+]
+
+# Posições táticas (Win at Chess 1 a 10) com o melhor lance em notação de coordenadas
+POSICOES_TATICAS = [
+    ('WAC.001', '2rr3k/pp3pp1/1nnqbN1p/3pN3/2pP4/2P3Q1/PPB4P/R4RK1 w - - 0 1', 'g3g6'),
+    ('WAC.002', '8/7p/5k2/5p2/p1p2P2/Pr1pPK2/1P1R3P/8 b - - 0 1', 'b3b2'),
+    ('WAC.003', '5rk1/1ppb3p/p1pb4/6q1/3P1p1r/2P1R2P/PP1BQ1P1/5RKN w - - 0 1', 'e3g3'),
+    ('WAC.004', 'r1bq2rk/pp3pbp/2p1p1pQ/7P/3P4/2PB1N2/PP3PPR/2KR4 w - - 0 1', 'h6h7'),
+    ('WAC.005', '5k2/6pp/p1qN4/1p1p4/3P4/2PKP2Q/PP3r2/3R4 b - - 0 1', 'c6c4'),
+    ('WAC.006', '7k/p7/1R5K/6r1/6p1/6P1/8/8 w - - 0 1', 'b6b7'),
+    ('WAC.007', 'rnbqkb1r/pppp1ppp/8/4P3/6n1/7P/PPPNPPP1/R1BQKBNR b KQkq - 0 1', 'g4e3'),
+    ('WAC.008', 'r4q1k/p2bR1rp/2p2Q1N/5p2/5p2/2P5/PP3PPP/R5K1 w - - 0 1', 'e7f7'),
+    ('WAC.009', '3q1rk1/p4pp1/2pb3p/3p4/6Pr/1PNQ4/P1PB1PP1/4RRK1 b - - 0 1', 'd6h2'),
+    ('WAC.010', '2br2k1/2q3rn/p2NppQ1/2p1P3/Pp5R/4P3/1P3PPP/3R2K1 w - - 0 1', 'h4h7'),
+]
+
+
+def medir_busca(fen, profundidade, **opcoes):
+    # Busca de profundidade fixa numa posição nova, com tabela de transposição vazia
+    jogo = Jogo()
+    jogo.carregar_fen(fen)
+    for nome, valor in opcoes.items():
+        setattr(jogo, nome, valor)
+    inicio = time.time()
+    pontuacao, movimento = jogo.busca_iterativa(profundidade_maxima=profundidade)
+    return jogo.nos, time.time() - inicio, pontuacao, movimento, jogo.fator_ramificacao()
+
+
+def relatar_estatisticas(profundidade=5, arquivo_json=None):
+    # Estatísticas da busca em cada posição fixa e no total; com arquivo_json, uma linha JSON por
+    # posição (com as iterações) para comparar versões fora daqui
+    print(f'{"posição":<18}{"nós":>9}{"quiesc.":>9}{"nós/s":>8}{"cortes":>8}{"1º corte":>10}'
+          f'{"TT":>6}{"cortes TT":>11}{"EBF":>6}{"tempo":>8}')
+    total = EstatisticasBusca()
+    for nome, fen in POSICOES_BENCHMARK:
+        jogo = Jogo()
+        jogo.carregar_fen(fen)
+        estatisticas = jogo.estatisticas = EstatisticasBusca()
+        jogo.busca_iterativa(profundidade_maxima=profundidade)
+        print(f'{nome:<18}{estatisticas.nos:>9}{estatisticas.nos_quiescencia:>9}{estatisticas.nos_por_segundo():>8.0f}'
+              f'{estatisticas.cortes:>8}{estatisticas.taxa_primeiro_corte():>10.1%}{estatisticas.taxa_acertos_tt():>6.0%}'
+              f'{estatisticas.cortes_tt:>11}{estatisticas.fator_ramificacao():>6.2f}{estatisticas.tempo:>8.2f}')
+        if arquivo_json:
+            estatisticas.registrar_json(arquivo_json, posicao=nome, fen=fen, profundidade=profundidade)
+        for campo in ('nos', 'nos_quiescencia', 'cortes', 'cortes_primeiro', 'consultas_tt', 'acertos_tt',
+                      'cortes_tt', 'tempo'):
+            setattr(total, campo, getattr(total, campo) + getattr(estatisticas, campo))
+    print(f'{"total":<18}{total.nos:>9}{total.nos_quiescencia:>9}{total.nos_por_segundo():>8.0f}'
+          f'{total.cortes:>8}{total.taxa_primeiro_corte():>10.1%}{total.taxa_acertos_tt():>6.0%}'
+          f'{total.cortes_tt:>11}{"":>6}{total.tempo:>8.2f}')
+
+
+def comparar_ordenacao(profundidade=4):
+    total_sem = total_com = 0
+    print(f'{"posição":<18}{"nós sem ordenação":>20}{"nós com ordenação":>20}{"redução":>10}')
+    for nome, fen in POSICOES_BENCHMARK:
+        nos_sem, _, _, _, _ = medir_busca(fen, profundidade, ordenar_movimentos=False)
+        nos_com, _, _, _, _ = medir_busca(fen, profundidade, ordenar_movimentos=True)
+        total_sem += nos_sem
+        total_com += nos_com
+        print(f'{nome:<18}{nos_sem:>20}{nos_com:>20}{1 - nos_com / nos_sem:>10.1%}')
+    print(f'{"total":<18}{total_sem:>20}{total_com:>20}{1 - total_com / total_sem:>10.1%}')
+
+
+def comparar_quiescencia(profundidade=3):
+    # Acertos nas posições táticas, nós e tempo com a busca parando seco no horizonte e com
+    # a quiescência resolvendo as trocas pendentes
+    print(f'{"quiescência":<14}{"acertos":>9}{"nós":>12}{"tempo (s)":>11}  lances')
+    for usar in (False, True):
+        acertos = total_nos = 0
+        total_tempo = 0.0
+        lances = []
+        for _, fen, esperado in POSICOES_TATICAS:
+            nos, tempo, _, movimento, _ = medir_busca(fen, profundidade, usar_quiescencia=usar)
+            lance = movimento_uci(codificar_movimento(*movimento)) if movimento else '-'
+            acertos += lance == esperado
+            total_nos += nos
+            total_tempo += tempo
+            lances.append(lance)
+        print(f'{"com" if usar else "sem":<14}{acertos:>5}/{len(POSICOES_TATICAS):<3}{total_nos:>12}'
+              f'{total_tempo:>11.3f}  {" ".join(lances)}')
+
+
+# Configurações comparadas por --podas e --pvs (atributos do Jogo ligados ou desligados)
+CONFIGURACOES_PODAS = [
+    ('sem podas', {'usar_movimento_nulo': False, 'usar_reducoes': False}),
+    ('movimento nulo', {'usar_movimento_nulo': True, 'usar_reducoes': False}),
+    ('reduções', {'usar_movimento_nulo': False, 'usar_reducoes': True}),
+    ('nulo + reduções', {'usar_movimento_nulo': True, 'usar_reducoes': True}),
+]
+CONFIGURACOES_PVS = [
+    ('janela inteira', {'usar_pvs': False, 'usar_aspiracao': False}),
+    ('pvs', {'usar_pvs': True, 'usar_aspiracao': False}),
+    ('aspiração', {'usar_pvs': False, 'usar_aspiracao': True}),
+    ('pvs + aspiração', {'usar_pvs': True, 'usar_aspiracao': True}),
+]
+
+
+def comparar_configuracoes(configuracoes, profundidade=5):
+    # Nós, tempo e fator de ramificação efetivo (média das posições) de cada configuração,
+    # mais os acertos táticos de cada uma na mesma profundidade
+    print(f'{"configuração":<18}{"nós":>12}{"tempo (s)":>11}{"ramificação":>13}{"acertos":>9}')
+    for nome, opcoes in configuracoes:
+        total_nos = 0
+        total_tempo = 0.0
+        fatores = []
+        for _, fen in POSICOES_BENCHMARK:
+            nos, tempo, _, _, fator = medir_busca(fen, profundidade, **opcoes)
+            total_nos += nos
+            total_tempo += tempo
+            fatores.append(fator)
+        acertos = 0
+        for _, fen, esperado in POSICOES_TATICAS:
+            _, _, _, movimento, _ = medir_busca(fen, profundidade, **opcoes)
+            acertos += bool(movimento) and movimento_uci(codificar_movimento(*movimento)) == esperado
+        print(f'{nome:<18}{total_nos:>12}{total_tempo:>11.3f}{sum(fatores) / len(fatores):>13.2f}'
+              f'{acertos:>5}/{len(POSICOES_TATICAS)}')
+
+
+def comparar_trabalhadores(profundidade=5, trabalhadores=(1, 2, 4, 8)):
+    # Tempo até a profundidade fixa com cada número de processos (contando o principal), tabela
+    # vazia em cada posição; o ganho é relativo ao primeiro número da lista
+    print(f'{"processos":>10}{"tempo (s)":>12}{"ganho":>8}{"nós":>12}{"nós/s":>10}')
+    referencia = None
+    for quantidade in trabalhadores:
+        jogo = Jogo()
+        busca = BuscaParalela(jogo, quantidade)
+        total_tempo = total_nos = 0
+        for _, fen in POSICOES_BENCHMARK:
+            busca.tabela.limpar()
+            jogo.carregar_fen(fen)
+            inicio = time.time()
+            busca.busca_iterativa(profundidade_maxima=profundidade)
+            total_tempo += time.time() - inicio
+            total_nos += busca.nos
+        busca.fechar()
+        referencia = referencia or total_tempo
+        print(f'{quantidade:>10}{total_tempo:>12.3f}{referencia / total_tempo:>7.2f}x{total_nos:>12}'
+              f'{total_nos / total_tempo:>10.0f}')
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Benchmarks da busca nas posições fixas')
+    argumentos.add_argument('profundidade', type=int, nargs='?', default=4)
+    argumentos.add_argument('--quiescencia', action='store_true',
+                            help='compara acertos táticos, nós e tempo sem e com a quiescência')
+    argumentos.add_argument('--podas', action='store_true',
+                            help='compara nós e fator de ramificação sem e com movimento nulo e reduções')
+    argumentos.add_argument('--pvs', action='store_true',
+                            help='compara nós e fator de ramificação sem e com PVS e janelas de aspiração')
+    argumentos.add_argument('--estatisticas', metavar='ARQUIVO', nargs='?', const='-',
+                            help='estatísticas da busca por posição; com ARQUIVO elas também são '
+                                 'acrescentadas a ele em JSON Lines')
+    argumentos.add_argument('--paralelo', metavar='N,N,...',
+                            help='mede o ganho da busca paralela com estes números de processos (ex.: 1,2,4,8)')
+    opcoes = argumentos.parse_args()
+    if opcoes.estatisticas:
+        if opcoes.estatisticas == '-':
+            relatar_estatisticas(opcoes.profundidade)
+        else:
+            with open(opcoes.estatisticas, 'a', encoding='utf-8') as arquivo:
+                relatar_estatisticas(opcoes.profundidade, arquivo)
+    elif opcoes.paralelo:
+        comparar_trabalhadores(opcoes.profundidade, [int(numero) for numero in opcoes.paralelo.split(',')])
+    elif opcoes.podas:
+        comparar_configuracoes(CONFIGURACOES_PODAS, opcoes.profundidade)
+    elif opcoes.pvs:
+        comparar_configuracoes(CONFIGURACOES_PVS, opcoes.profundidade)
+    elif opcoes.quiescencia:
+        comparar_quiescencia(opcoes.profundidade)
+    else:
+        comparar_ordenacao(opcoes.profundidade)
@@ -0,0 +1,100 @@
+import argparse
+import os
+import time
+
+# Sem janela de verdade quando não há tela (servidor, CI); com tela, roda a janela normal
+if not os.environ.get('DISPLAY') and os.name != 'nt':
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+import XadrezPython2 as interface
+
+
+def quadro(jogo, incremental):
+    # Um quadro ocioso do laço principal; sem incremental, como era antes dos caches: tudo
+    # redesenhado, os símbolos renderizados de novo e a janela inteira enviada
+    pygame.event.get()
+    if incremental:
+        pygame.display.update(jogo.desenhar_tabuleiro() + jogo.desenhar_info())
+    else:
+        jogo.invalidar()
+        interface.GLIFOS.clear()
+        jogo.desenhar_tabuleiro()
+        jogo.desenhar_info()
+        _painel_sem_cache(jogo)
+        pygame.display.flip()
+
+
+def medir_quadro(quadros=300):
+    # Tempo médio de um quadro redesenhado por inteiro e de um quadro em que nada mudou
+    jogo = interface.JogoGrafico(memoria_tt_mb=0)
+    tempos = {}
+    for incremental in (False, True):
+        quadro(jogo, incremental)
+        inicio = time.perf_counter()
+        for _ in range(quadros):
+            quadro(jogo, incremental)
+        tempos[incremental] = (time.perf_counter() - inicio) / quadros
+    print(f'quadro completo: {tempos[False] * 1000:.3f} ms   '
+          f'quadro incremental: {tempos[True] * 1000:.3f} ms   ({tempos[False] / tempos[True]:.0f}x)')
+
+
+def _painel_sem_cache(jogo):
+    # O painel como era desenhado antes: as 25 últimas entradas quebradas e renderizadas de novo
+    for cor, descricao in jogo.historico[-interface.HISTORICO_VISIVEL:]:
+        for linha in jogo.dividir_texto(descricao, 300, interface.FONTE_INFO):
+            interface.FONTE_INFO.render(linha, True, interface.AZUL if cor == 'azul' else interface.VERMELHO)
+
+
+def medir_painel(entradas=(10, 100, 1000), repeticoes=100):
+    # Custo de redesenhar o painel de histórico em partidas de tamanhos diferentes, com e sem as
+    # linhas já renderizadas
+    descricao = 'IA move Cavalo de (1,0) para (2,2) | Eval: 35 | VP: b8c6 g1f3 g8f6 b1c3 e7e5 d2d4 e5d4 f3d4'
+    for total in entradas:
+        jogo = interface.JogoGrafico(memoria_tt_mb=0)
+        inicio = time.perf_counter()
+        for indice in range(total):
+            jogo.registrar_historico('vermelho' if indice % 2 else 'azul', descricao)
+        registro = (time.perf_counter() - inicio) / total
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            _painel_sem_cache(jogo)
+        sem_cache = (time.perf_counter() - inicio) / repeticoes
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            jogo.historico_desenhado = None
+            jogo.desenhar_info()
+        com_cache = (time.perf_counter() - inicio) / repeticoes
+        print(f'{total:>5} entradas: painel sem cache {sem_cache * 1000:.3f} ms   com cache {com_cache * 1000:.3f} ms   '
+              f'(registro de uma entrada {registro * 1000:.3f} ms)')
+
+
+def medir_cpu_ocioso(segundos=3.0):
+    # Uso de CPU do processo esperando o clique: o laço antigo (sem relógio, tudo redesenhado)
+    # contra o atual (dirty rects e limite de quadros)
+    jogo = interface.JogoGrafico(memoria_tt_mb=0)
+    for nome, incremental, limite in (('sem relógio, redesenho completo', False, 0),
+                                      (f'{interface.QUADROS_POR_SEGUNDO} quadros/s, incremental', True,
+                                       interface.QUADROS_POR_SEGUNDO)):
+        relogio = pygame.time.Clock()
+        quadros = 0
+        inicio, cpu = time.perf_counter(), time.process_time()
+        while time.perf_counter() - inicio < segundos:
+            quadro(jogo, incremental)
+            relogio.tick(limite)
+            quadros += 1
+        decorrido = time.perf_counter() - inicio
+        print(f'{nome:>36}: CPU {100 * (time.process_time() - cpu) / decorrido:5.1f}%   '
+              f'{quadros / decorrido:8.0f} quadros/s')
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Custo de desenho da interface e uso de CPU ocioso')
+    argumentos.add_argument('segundos', type=float, nargs='?', default=3.0,
+                            help='duração de cada medição de CPU ocioso')
+    opcoes = argumentos.parse_args()
+    medir_quadro()
+    medir_painel()
+    medir_cpu_ocioso(opcoes.segundos)
+    pygame.quit()
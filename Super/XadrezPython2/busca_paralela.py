@@ -0,0 +1,130 @@
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+
+from motor_xadrez import Jogo, TabelaTransposicao, BuscaInterrompida, MEMORIA_TT_PADRAO_MB, PROFUNDIDADE_MAXIMA
+
+# Busca paralela no estilo Lazy SMP: o processo principal busca normalmente enquanto processos
+# auxiliares buscam a mesma posição, todos escrevendo numa única tabela de transposição em
+# memória compartilhada. Os auxiliares não devolvem lances: o que encontram chega ao principal
+# pela tabela, em cortes e movimentos que ele não precisa calcular. Processos em vez de threads
+# porque a busca é Python puro e o GIL serializaria as threads.
+
+ESPERA_AUXILIAR = 1.0  # Segundos de espera pela contagem de nós de um auxiliar depois da busca
+
+
+# Tabela de transposição sobre um bloco de memória compartilhada, criado pelo processo principal
+# e aberto pelo nome nos auxiliares
+class TabelaTransposicaoCompartilhada(TabelaTransposicao):
+    def __init__(self, memoria_mb=MEMORIA_TT_PADRAO_MB, nome=None):
+        self.nome = nome
+        self.memoria = None
+        super().__init__(memoria_mb)
+
+    def _alocar(self):
+        if self.memoria is None:
+            self.memoria = shared_memory.SharedMemory(name=self.nome, create=self.nome is None, size=16 * self.tamanho)
+            self.nome = self.memoria.name
+        else:
+            self.memoria.buf[:16 * self.tamanho] = bytes(16 * self.tamanho)
+        self.chaves = self.memoria.buf[:8 * self.tamanho].cast('Q')
+        self.dados = self.memoria.buf[8 * self.tamanho:16 * self.tamanho].cast('Q')
+
+    def fechar(self, apagar=False):
+        # As visões precisam ser soltas antes de fechar o bloco; só quem criou deve apagá-lo
+        self.chaves.release()
+        self.dados.release()
+        self.memoria.close()
+        if apagar:
+            self.memoria.unlink()
+
+
+# Jogo de um processo auxiliar: além dos limites normais, para quando o principal termina
+class JogoAuxiliar(Jogo):
+    def __init__(self, evento_parar, tabela):
+        super().__init__(memoria_tt_mb=0)
+        self.evento_parar = evento_parar
+        self.tabela_transposicao = tabela
+
+    def _verificar_limites(self):
+        if self.evento_parar.is_set():
+            raise BuscaInterrompida()
+        super()._verificar_limites()
+
+
+def _auxiliar(indice, nome_tabela, memoria_mb, pedidos, respostas, evento_parar):
+    tabela = TabelaTransposicaoCompartilhada(memoria_mb, nome_tabela)
+    jogo = JogoAuxiliar(evento_parar, tabela)
+    while True:
+        pedido = pedidos.get()
+        if pedido is None:
+            break
+        numero, fen, profundidade_maxima = pedido
+        jogo.carregar_fen(fen)
+        # Metade dos auxiliares começa um ply adiante: assim eles não repetem a ordem do
+        # principal e preenchem a tabela com as iterações que ele ainda vai fazer
+        jogo.busca_iterativa(None, None, profundidade_maxima, profundidade_inicial=1 + indice % 2)
+        respostas.put((numero, jogo.nos))
+    tabela.fechar()
+
+
+class BuscaParalela:
+    def __init__(self, jogo, trabalhadores=2, memoria_tt_mb=MEMORIA_TT_PADRAO_MB):
+        # trabalhadores conta o processo principal: com 1 a busca é a sequencial de sempre
+        self.jogo = jogo
+        self.tabela = TabelaTransposicaoCompartilhada(memoria_tt_mb)
+        jogo.tabela_transposicao = self.tabela
+        self.evento_parar = multiprocessing.Event()
+        self.respostas = multiprocessing.Queue()
+        self.pedidos = []
+        self.processos = []
+        self.nos = 0  # Nós de todos os processos na última busca
+        self.numero_busca = 0  # Separa as respostas atrasadas de uma busca anterior
+        for indice in range(1, trabalhadores):
+            pedidos = multiprocessing.Queue()
+            processo = multiprocessing.Process(target=_auxiliar, daemon=True,
+                                               args=(indice, self.tabela.nome, memoria_tt_mb, pedidos,
+                                                     self.respostas, self.evento_parar))
+            processo.start()
+            self.pedidos.append(pedidos)
+            self.processos.append(processo)
+
+    def busca_iterativa(self, tempo_limite=None, limite_nos=None, profundidade_maxima=PROFUNDIDADE_MAXIMA):
+        # Mesmo formato de Jogo.busca_iterativa; o limite de nós vale para o processo principal
+        self.evento_parar.clear()
+        self.numero_busca += 1
+        fen = self.jogo.gerar_fen()
+        for pedidos in self.pedidos:
+            pedidos.put((self.numero_busca, fen, profundidade_maxima))
+        try:
+            resultado = self.jogo.busca_iterativa(tempo_limite, limite_nos, profundidade_maxima)
+        finally:
+            self.evento_parar.set()
+            self.nos = self.jogo.nos + self._nos_auxiliares()
+        return resultado
+
+    def _nos_auxiliares(self):
+        # Soma os nós que os auxiliares informam ao parar; um auxiliar que morreu nunca responde,
+        # e aí a contagem fica com o que já chegou em vez de travar a busca
+        total = 0
+        faltam = len(self.pedidos)
+        while faltam:
+            try:
+                numero, nos = self.respostas.get(timeout=ESPERA_AUXILIAR)
+            except queue.Empty:
+                if not all(processo.is_alive() for processo in self.processos):
+                    break
+                continue
+            if numero == self.numero_busca:
+                total += nos
+                faltam -= 1
+        return total
+
+    def fechar(self):
+        for pedidos in self.pedidos:
+            pedidos.put(None)
+        for processo in self.processos:
+            processo.join()
+        # O jogo volta a ter uma tabela própria e continua utilizável sem os auxiliares
+        self.jogo.tabela_transposicao = TabelaTransposicao(self.tabela.tamanho * 16 / (1024 * 1024))
+        self.tabela.fechar(apagar=True)
@@ -0,0 +1,127 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+
+from motor_xadrez import Jogo
+from pgn_xadrez import ler_pgn
+
+# Livro de aberturas no leiaute do Polyglot: registros de 16 bytes big-endian (chave de 64 bits,
+# movimento de 16, peso de 16 e 32 bits de aprendizado sem uso), ordenados pela chave. A chave é
+# o hash de Zobrist do próprio motor, e não o do Polyglot, então os livros só servem para ele.
+REGISTRO = struct.Struct('>QHHI')
+LIVRO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'livro_aberturas.bin')
+PESO_MAXIMO = 0xFFFF
+
+
+def movimento_para_polyglot(movimento):
+    # Movimento do motor para os 16 bits do Polyglot: coluna e linha (0 = linha 1) de destino
+    # e de origem e a promoção (1 cavalo a 4 rainha, os mesmos números dos tipos do motor)
+    origem = movimento & 63
+    destino = (movimento >> 6) & 63
+    return ((destino % 8) | ((7 - destino // 8) << 3) | ((origem % 8) << 6) | ((7 - origem // 8) << 9) |
+            ((movimento >> 12) << 12))
+
+
+def polyglot_para_movimento(codigo):
+    destino = (7 - ((codigo >> 3) & 7)) * 8 + (codigo & 7)
+    origem = (7 - ((codigo >> 9) & 7)) * 8 + ((codigo >> 6) & 7)
+    return origem | (destino << 6) | (((codigo >> 12) & 7) << 12)
+
+
+class LivroAberturas:
+    def __init__(self, caminho=LIVRO_PADRAO, semente=None):
+        # O arquivo é mapeado na memória: só as páginas tocadas pela busca binária são lidas
+        self.arquivo = open(caminho, 'rb')
+        tamanho = os.path.getsize(caminho)
+        self.dados = mmap.mmap(self.arquivo.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else b''
+        self.registros = tamanho // REGISTRO.size
+        self.sorteio = random.Random(semente)
+
+    def entradas(self, chave):
+        # Busca binária pela primeira entrada da chave; as demais vêm logo depois dela
+        inicio, fim = 0, self.registros
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            if REGISTRO.unpack_from(self.dados, meio * REGISTRO.size)[0] < chave:
+                inicio = meio + 1
+            else:
+                fim = meio
+        encontradas = []
+        while inicio < self.registros:
+            chave_registro, codigo, peso, _ = REGISTRO.unpack_from(self.dados, inicio * REGISTRO.size)
+            if chave_registro != chave:
+                break
+            encontradas.append((polyglot_para_movimento(codigo), peso))
+            inicio += 1
+        return encontradas
+
+    def escolher(self, jogo):
+        # Sorteia um lance legal do livro para a posição do jogo, com probabilidade proporcional
+        # ao peso; devolve 0 fora do livro
+        legais = jogo._movimentos_legais(jogo.lado)
+        candidatos = [(movimento, peso) for movimento, peso in self.entradas(jogo.hash)
+                      if peso and movimento in legais]
+        if not candidatos:
+            return 0
+        return self.sorteio.choices([movimento for movimento, _ in candidatos],
+                                    [peso for _, peso in candidatos])[0]
+
+    def fechar(self):
+        if self.registros:
+            self.dados.close()
+        self.arquivo.close()
+
+
+def construir_livro(caminhos_pgn, destino=LIVRO_PADRAO, maximo_lances=20, minimo_partidas=1):
+    # Joga as partidas no motor até maximo_lances meios-lances (ou até um lance que o jogo não
+    # tem, como o roque) e soma os pesos de cada lance em cada posição: 2 quando quem jogou
+    # venceu, 1 no empate e 0 na derrota. Devolve (partidas lidas, registros gravados).
+    pesos = {}
+    vezes = {}
+    partidas = 0
+    for caminho in caminhos_pgn:
+        with open(caminho, encoding='utf-8', errors='replace') as arquivo:
+            for cabecalhos, lances, resultado in ler_pgn(arquivo):
+                partidas += 1
+                jogo = Jogo(memoria_tt_mb=0)
+                if 'FEN' in cabecalhos:
+                    jogo.carregar_fen(cabecalhos['FEN'])
+                for san in lances[:maximo_lances]:
+                    try:
+                        movimento = jogo.movimento_san(san)
+                    except ValueError:
+                        break
+                    if resultado == '1/2-1/2':
+                        peso = 1
+                    else:
+                        peso = 2 if resultado == ('1-0', '0-1')[jogo.lado] else 0
+                    entrada = (jogo.hash, movimento_para_polyglot(movimento))
+                    pesos[entrada] = pesos.get(entrada, 0) + peso
+                    vezes[entrada] = vezes.get(entrada, 0) + 1
+                    jogo.fazer_movimento(movimento)
+    registros = sorted((chave, codigo, peso) for (chave, codigo), peso in pesos.items()
+                       if peso and vezes[(chave, codigo)] >= minimo_partidas)
+    # Pesos acima de 16 bits são reduzidos na mesma proporção dentro de cada posição
+    maximos = {}
+    for chave, _, peso in registros:
+        maximos[chave] = max(maximos.get(chave, 0), peso)
+    with open(destino, 'wb') as arquivo:
+        for chave, codigo, peso in registros:
+            if maximos[chave] > PESO_MAXIMO:
+                peso = max(1, peso * PESO_MAXIMO // maximos[chave])
+            arquivo.write(REGISTRO.pack(chave, codigo, peso, 0))
+    return partidas, len(registros)
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Cria o livro de aberturas do motor a partir de partidas em PGN')
+    argumentos.add_argument('pgn', nargs='+', help='arquivos PGN com as partidas')
+    argumentos.add_argument('-o', '--saida', default=LIVRO_PADRAO, help='arquivo do livro a gravar')
+    argumentos.add_argument('--lances', type=int, default=20, help='meios-lances de cada partida que entram no livro')
+    argumentos.add_argument('--minimo', type=int, default=1,
+                            help='partidas em que um lance precisa aparecer para entrar no livro')
+    opcoes = argumentos.parse_args()
+    partidas, registros = construir_livro(opcoes.pgn, opcoes.saida, opcoes.lances, opcoes.minimo)
+    print(f'{partidas} partidas, {registros} registros gravados em {opcoes.saida}')
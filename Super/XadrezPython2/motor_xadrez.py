@@ -0,0 +1,1620 @@
+import json
+import random
+import threading
+import time
+from array import array
+
+# Mapeamento dos símbolos Unicode das peças
+SIMBOLOS_PECAS = {
+    'rei_azul': '\u2654',     # ♔
+    'rainha_azul': '\u2655',  # ♕
+    'torre_azul': '\u2656',   # ♖
+    'bispo_azul': '\u2657',   # ♗
+    'cavalo_azul': '\u2658',  # ♘
+    'peao_azul': '\u2659',    # ♙
+    'rei_vermelho': '\u265A',     # ♚
+    'rainha_vermelho': '\u265B',  # ♛
+    'torre_vermelho': '\u265C',   # ♜
+    'bispo_vermelho': '\u265D',   # ♝
+    'cavalo_vermelho': '\u265E',  # ♞
+    'peao_vermelho': '\u265F',    # ♟
+}
+
+# Representação em bitboards: a casa (x, y) corresponde ao bit y * 8 + x
+TIPOS_PECAS = ['peao', 'cavalo', 'bispo', 'torre', 'rainha', 'rei']
+CORES = ['azul', 'vermelho']
+PEAO, CAVALO, BISPO, TORRE, RAINHA, REI = range(6)
+INDICE_TIPO = {tipo: i for i, tipo in enumerate(TIPOS_PECAS)}
+INDICE_COR = {cor: i for i, cor in enumerate(CORES)}
+VAZIO = -1  # Casa sem peça no vetor de casas (peças são codificadas como cor * 6 + tipo)
+
+TODAS_CASAS = (1 << 64) - 1
+COLUNA_A = 0x0101010101010101
+COLUNA_H = COLUNA_A << 7
+LINHAS = [0xFF << (8 * y) for y in range(8)]
+# Linha onde o peão promove, por cor
+LINHA_PROMOCAO = [LINHAS[0], LINHAS[7]]
+PROMOCOES = [RAINHA, TORRE, BISPO, CAVALO]
+
+# Direitos de roque como bits; MASCARA_ROQUE[casa] apaga os direitos que dependem da casa
+# (rei ou torre saindo dela, ou torre capturada nela)
+ROQUE_AZUL_MAIS, ROQUE_AZUL_MENOS, ROQUE_VERMELHO_MAIS, ROQUE_VERMELHO_MENOS = 1, 2, 4, 8
+MASCARA_ROQUE = [15] * 64
+MASCARA_ROQUE[7 * 8 + 4] &= ~(ROQUE_AZUL_MAIS | ROQUE_AZUL_MENOS)
+MASCARA_ROQUE[7 * 8 + 7] &= ~ROQUE_AZUL_MAIS
+MASCARA_ROQUE[7 * 8 + 0] &= ~ROQUE_AZUL_MENOS
+MASCARA_ROQUE[0 * 8 + 4] &= ~(ROQUE_VERMELHO_MAIS | ROQUE_VERMELHO_MENOS)
+MASCARA_ROQUE[0 * 8 + 7] &= ~ROQUE_VERMELHO_MAIS
+MASCARA_ROQUE[0 * 8 + 0] &= ~ROQUE_VERMELHO_MENOS
+
+VALORES_PECAS = {'peao': 10, 'cavalo': 30, 'bispo': 30, 'torre': 50, 'rainha': 90, 'rei': 900}
+VALOR_POR_TIPO = [VALORES_PECAS[tipo] for tipo in TIPOS_PECAS]
+
+# Avaliação: material e tabelas de posição para meio-jogo (MG) e final (EG), no estilo PeSTO,
+# interpoladas pela fase do jogo. As tabelas estão do ponto de vista do azul com a casa
+# (0, 0) no canto superior esquerdo, como o tabuleiro; para o vermelho a linha é espelhada.
+VALOR_MG = [82, 337, 365, 477, 1025, 0]
+VALOR_EG = [94, 281, 297, 512, 936, 0]
+FASE_TIPO = [0, 1, 1, 2, 4, 0]
+FASE_TOTAL = 24
+POSICAO_MG = [
+    [0, 0, 0, 0, 0, 0, 0, 0,
+     98, 134, 61, 95, 68, 126, 34, -11,
+     -6, 7, 26, 31, 65, 56, 25, -20,
+     -14, 13, 6, 21, 23, 12, 17, -23,
+     -27, -2, -5, 12, 17, 6, 10, -25,
+     -26, -4, -4, -10, 3, 3, 33, -12,
+     -35, -1, -20, -23, -15, 24, 38, -22,
+     0, 0, 0, 0, 0, 0, 0, 0],
+    [-167, -89, -34, -49, 61, -97, -15, -107,
+     -73, -41, 72, 36, 23, 62, 7, -17,
+     -47, 60, 37, 65, 84, 129, 73, 44,
+     -9, 17, 19, 53, 37, 69, 18, 22,
+     -13, 4, 16, 13, 28, 19, 21, -8,
+     -23, -9, 12, 10, 19, 17, 25, -16,
+     -29, -53, -12, -3, -1, 18, -14, -19,
+     -105, -21, -58, -33, -17, -28, -19, -23],
+    [-29, 4, -82, -37, -25, -42, 7, -8,
+     -26, 16, -18, -13, 30, 59, 18, -47,
+     -16, 37, 43, 40, 35, 50, 37, -2,
+     -4, 5, 19, 50, 37, 37, 7, -2,
+     -6, 13, 13, 26, 34, 12, 10, 4,
+     0, 15, 15, 15, 14, 27, 18, 10,
+     4, 15, 16, 0, 7, 21, 33, 1,
+     -33, -3, -14, -21, -13, -12, -39, -21],
+    [32, 42, 32, 51, 63, 9, 31, 43,
+     27, 32, 58, 62, 80, 67, 26, 44,
+     -5, 19, 26, 36, 17, 45, 61, 16,
+     -24, -11, 7, 26, 24, 35, -8, -20,
+     -36, -26, -12, -1, 9, -7, 6, -23,
+     -45, -25, -16, -17, 3, 0, -5, -33,
+     -44, -16, -20, -9, -1, 11, -6, -71,
+     -19, -13, 1, 17, 16, 7, -37, -26],
+    [-28, 0, 29, 12, 59, 44, 43, 45,
+     -24, -39, -5, 1, -16, 57, 28, 54,
+     -13, -17, 7, 8, 29, 56, 47, 57,
+     -27, -27, -16, -16, -1, 17, -2, 1,
+     -9, -26, -9, -10, -2, -4, 3, -3,
+     -14, 2, -11, -2, -5, 2, 14, 5,
+     -35, -8, 11, 2, 8, 15, -3, 1,
+     -1, -18, -9, 10, -15, -25, -31, -50],
+    [-65, 23, 16, -15, -56, -34, 2, 13,
+     29, -1, -20, -7, -8, -4, -38, -29,
+     -9, 24, 2, -16, -20, 6, 22, -22,
+     -17, -20, -12, -27, -30, -25, -14, -36,
+     -49, -1, -27, -39, -46, -44, -33, -51,
+     -14, -14, -22, -46, -44, -30, -15, -27,
+     1, 7, -8, -64, -43, -16, 9, 8,
+     -15, 36, 12, -54, 8, -28, 24, 14],
+]
+POSICAO_EG = [
+    [0, 0, 0, 0, 0, 0, 0, 0,
+     178, 173, 158, 134, 147, 132, 165, 187,
+     94, 100, 85, 67, 56, 53, 82, 84,
+     32, 24, 13, 5, -2, 4, 17, 17,
+     13, 9, -3, -7, -7, -8, 3, -1,
+     4, 7, -6, 1, 0, -5, -1, -8,
+     13, 8, 8, 10, 13, 0, 2, -7,
+     0, 0, 0, 0, 0, 0, 0, 0],
+    [-58, -38, -13, -28, -31, -27, -63, -99,
+     -25, -8, -25, -2, -9, -25, -24, -52,
+     -24, -20, 10, 9, -1, -9, -19, -41,
+     -17, 3, 22, 22, 22, 11, 8, -18,
+     -18, -6, 16, 25, 16, 17, 4, -18,
+     -23, -3, -1, 15, 10, -3, -20, -22,
+     -42, -20, -10, -5, -2, -20, -23, -44,
+     -29, -51, -23, -15, -22, -18, -50, -64],
+    [-14, -21, -11, -8, -7, -9, -17, -24,
+     -8, -4, 7, -12, -3, -13, -4, -14,
+     2, -8, 0, -1, -2, 6, 0, 4,
+     -3, 9, 12, 9, 14, 10, 3, 2,
+     -6, 3, 13, 19, 7, 10, -3, -9,
+     -12, -3, 8, 10, 13, 3, -7, -15,
+     -14, -18, -7, -1, 4, -9, -15, -27,
+     -23, -9, -23, -5, -9, -16, -5, -17],
+    [13, 10, 18, 15, 12, 12, 8, 5,
+     11, 13, 13, 11, -3, 3, 8, 3,
+     7, 7, 7, 5, 4, -3, -5, -3,
+     4, 3, 13, 1, 2, 1, -1, 2,
+     3, 5, 8, 4, -5, -6, -8, -11,
+     -4, 0, -5, -1, -7, -12, -8, -16,
+     -6, -6, 0, 2, -9, -9, -11, -3,
+     -9, 2, 3, -1, -5, -13, 4, -20],
+    [-9, 22, 22, 27, 27, 19, 10, 20,
+     -17, 20, 32, 41, 58, 25, 30, 0,
+     -20, 6, 9, 49, 47, 35, 19, 9,
+     3, 22, 24, 45, 57, 40, 57, 36,
+     -18, 28, 19, 47, 31, 34, 39, 23,
+     -16, -27, 15, 6, 9, 17, 10, 5,
+     -22, -23, -30, -16, -16, -23, -36, -32,
+     -33, -28, -22, -43, -5, -32, -20, -41],
+    [-74, -35, -18, -18, -11, 15, 4, -17,
+     -12, 17, 14, 17, 17, 38, 23, 11,
+     10, 17, 23, 15, 20, 45, 44, 13,
+     -8, 22, 24, 27, 26, 33, 26, 3,
+     -18, -4, 21, 24, 27, 23, 9, -11,
+     -19, -3, 11, 21, 23, 16, 7, -9,
+     -27, -11, 4, 13, 14, 4, -5, -17,
+     -53, -34, -21, -11, -28, -14, -24, -43],
+]
+
+def _tabela_avaliacao(valores, posicao):
+    # Vetor compacto indexado por codigo * 64 + casa, já com sinal do ponto de vista do
+    # vermelho (positivo é bom para a IA), somando material e posição
+    tabela = array('h', bytes(2 * 12 * 64))
+    for tipo in range(6):
+        for casa in range(64):
+            tabela[tipo * 64 + casa] = -(valores[tipo] + posicao[tipo][casa])
+            tabela[(6 + tipo) * 64 + casa] = valores[tipo] + posicao[tipo][casa ^ 56]
+    return tabela
+
+AVALIACAO_MG = _tabela_avaliacao(VALOR_MG, POSICAO_MG)
+AVALIACAO_EG = _tabela_avaliacao(VALOR_EG, POSICAO_EG)
+FASE_CODIGO = FASE_TIPO * 2
+
+# Letras da notação FEN (maiúsculas para o azul, que joga primeiro)
+LETRAS_FEN = {'p': 'peao', 'n': 'cavalo', 'b': 'bispo', 'r': 'torre', 'q': 'rainha', 'k': 'rei'}
+FEN_INICIAL = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+# Letras das peças na notação algébrica (SAN); o peão não tem letra
+TIPO_SAN = {'N': CAVALO, 'B': BISPO, 'R': TORRE, 'Q': RAINHA, 'K': REI}
+LETRA_SAN = {tipo: letra for letra, tipo in TIPO_SAN.items()}
+
+def _ataques_saltos(saltos):
+    # Tabela de ataques para peças de alcance fixo (cavalo e rei)
+    tabela = []
+    for casa in range(64):
+        x, y = casa % 8, casa // 8
+        ataques = 0
+        for dx, dy in saltos:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < 8 and 0 <= ny < 8:
+                ataques |= 1 << (ny * 8 + nx)
+        tabela.append(ataques)
+    return tabela
+
+def _raio(casa, direcoes, ocupacao):
+    # Ataques deslizantes calculados casa a casa (usado apenas para montar as tabelas)
+    ataques = 0
+    for dx, dy in direcoes:
+        nx, ny = casa % 8 + dx, casa // 8 + dy
+        while 0 <= nx < 8 and 0 <= ny < 8:
+            bit = 1 << (ny * 8 + nx)
+            ataques |= bit
+            if ocupacao & bit:
+                break
+            nx += dx
+            ny += dy
+    return ataques
+
+def _tabela_deslizante(direcoes):
+    # Para cada casa, a máscara das casas internas da linha (as bordas nunca bloqueiam)
+    # e um dicionário que leva cada ocupação possível dessa máscara aos ataques correspondentes.
+    # É a ideia dos bitboards rotacionados/mágicos, com o dicionário fazendo o papel do hash.
+    mascaras = []
+    tabelas = []
+    for casa in range(64):
+        mascara = 0
+        for dx, dy in direcoes:
+            nx, ny = casa % 8 + dx, casa // 8 + dy
+            while 0 <= nx + dx < 8 and 0 <= ny + dy < 8:
+                mascara |= 1 << (ny * 8 + nx)
+                nx += dx
+                ny += dy
+        tabela = {}
+        subconjunto = 0
+        while True:
+            tabela[subconjunto] = _raio(casa, direcoes, subconjunto)
+            subconjunto = (subconjunto - mascara) & mascara
+            if subconjunto == 0:
+                break
+        mascaras.append(mascara)
+        tabelas.append(tabela)
+    return mascaras, tabelas
+
+ATAQUES_CAVALO = _ataques_saltos([(1, 2), (1, -2), (-1, 2), (-1, -2), (2, 1), (2, -1), (-2, 1), (-2, -1)])
+ATAQUES_REI = _ataques_saltos([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# Casas atacadas por um peão de cada cor (azul avança para y menor)
+ATAQUES_PEAO = [_ataques_saltos([(-1, -1), (1, -1)]), _ataques_saltos([(-1, 1), (1, 1)])]
+MASCARAS_HORIZONTAIS, ATAQUES_HORIZONTAIS = _tabela_deslizante([(-1, 0), (1, 0)])
+MASCARAS_VERTICAIS, ATAQUES_VERTICAIS = _tabela_deslizante([(0, -1), (0, 1)])
+MASCARAS_DIAGONAIS, ATAQUES_DIAGONAIS = _tabela_deslizante([(-1, -1), (1, 1)])
+MASCARAS_ANTIDIAGONAIS, ATAQUES_ANTIDIAGONAIS = _tabela_deslizante([(1, -1), (-1, 1)])
+
+def ataques_torre(casa, ocupacao):
+    return (ATAQUES_HORIZONTAIS[casa][ocupacao & MASCARAS_HORIZONTAIS[casa]] |
+            ATAQUES_VERTICAIS[casa][ocupacao & MASCARAS_VERTICAIS[casa]])
+
+def ataques_bispo(casa, ocupacao):
+    return (ATAQUES_DIAGONAIS[casa][ocupacao & MASCARAS_DIAGONAIS[casa]] |
+            ATAQUES_ANTIDIAGONAIS[casa][ocupacao & MASCARAS_ANTIDIAGONAIS[casa]])
+
+# Chaves de Zobrist: semente fixa para que o mesmo jogo gere sempre as mesmas chaves
+_gerador_zobrist = random.Random(20241018)
+ZOBRIST_PECAS = [[_gerador_zobrist.getrandbits(64) for _ in range(64)] for _ in range(12)]
+ZOBRIST_ROQUE = [_gerador_zobrist.getrandbits(64) for _ in range(16)]
+ZOBRIST_LADO = _gerador_zobrist.getrandbits(64)  # Presente quando é a vez do vermelho
+
+def _tabela_entre():
+    # ENTRE[a][b]: casas estritamente entre a e b quando estão na mesma linha, coluna ou diagonal
+    entre = [[0] * 64 for _ in range(64)]
+    for casa in range(64):
+        for dx, dy in [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]:
+            caminho = 0
+            nx, ny = casa % 8 + dx, casa // 8 + dy
+            while 0 <= nx < 8 and 0 <= ny < 8:
+                entre[casa][ny * 8 + nx] = caminho
+                caminho |= 1 << (ny * 8 + nx)
+                nx += dx
+                ny += dy
+    return entre
+
+ENTRE = _tabela_entre()
+
+def destinos_peoes(lado, peoes, vazias, inimigas):
+    # Movimentos de todos os peões de uma vez, deslocando o bitboard: devolve pares
+    # (destinos, recuo), onde o recuo leva cada destino de volta à casa de origem
+    if lado == 0:
+        simples = (peoes >> 8) & vazias
+        return ((simples, 8), (((simples & LINHAS[5]) >> 8) & vazias, 16),
+                (((peoes & ~COLUNA_A) >> 9) & inimigas, 9), (((peoes & ~COLUNA_H) >> 7) & inimigas, 7))
+    simples = (peoes << 8) & vazias
+    return ((simples, -8), (((simples & LINHAS[2]) << 8) & vazias, -16),
+            (((peoes & ~COLUNA_A) << 7) & inimigas, -7), (((peoes & ~COLUNA_H) << 9) & inimigas, -9))
+
+def ataques_peca(tipo, casa, ocupacao):
+    # Ataques de uma peça que não seja peão a partir da casa, dada a ocupação do tabuleiro
+    if tipo == CAVALO:
+        return ATAQUES_CAVALO[casa]
+    if tipo == BISPO:
+        return ataques_bispo(casa, ocupacao)
+    if tipo == TORRE:
+        return ataques_torre(casa, ocupacao)
+    if tipo == RAINHA:
+        return ataques_torre(casa, ocupacao) | ataques_bispo(casa, ocupacao)
+    return ATAQUES_REI[casa]
+
+# Movimentos são inteiros: origem | destino << 6 | tipo da promoção << 12 (0 quando não há promoção)
+def codificar_movimento(origem, destino, promocao=None):
+    x1, y1 = origem
+    x2, y2 = destino
+    return (y1 * 8 + x1) | ((y2 * 8 + x2) << 6) | (INDICE_TIPO[promocao] << 12 if promocao else 0)
+
+def nome_casa(casa):
+    # Nome algébrico da casa: (0, 7) é a1 (canto do azul) e (7, 0) é h8
+    return 'abcdefgh'[casa % 8] + str(8 - casa // 8)
+
+def movimento_uci(movimento):
+    # Movimento codificado em notação de coordenadas (e2e4, a7a8q)
+    texto = nome_casa(movimento & 63) + nome_casa((movimento >> 6) & 63)
+    if movimento >> 12:
+        texto += 'pnbrqk'[movimento >> 12]
+    return texto
+
+def decodificar_movimento(movimento):
+    origem = movimento & 63
+    destino = (movimento >> 6) & 63
+    promocao = movimento >> 12
+    if promocao:
+        return (origem % 8, origem // 8), (destino % 8, destino // 8), TIPOS_PECAS[promocao]
+    return (origem % 8, origem // 8), (destino % 8, destino // 8)
+
+# Classe para representar uma peça
+class Peca:
+    def __init__(self, tipo, cor):
+        self.tipo = tipo  # 'rei', 'rainha', 'bispo', 'cavalo', 'torre', 'peao'
+        self.cor = cor    # 'azul' ou 'vermelho'
+        self.simbolo = SIMBOLOS_PECAS[f'{tipo}_{cor}']
+        self.movimentos_realizados = 0  # Para roque e en passant
+
+    def movimentos_validos(self, x, y, tabuleiro, roque_disponivel):
+        movimentos = []
+        direcoes = []
+
+        if self.tipo == 'peao':
+            direcao = -1 if self.cor == 'azul' else 1
+            # Movimento simples
+            novo_y = y + direcao
+            if 0 <= novo_y < 8:
+                if tabuleiro[novo_y][x] is None:
+                    movimentos.append((x, novo_y))
+                    # Movimento duplo no primeiro movimento
+                    if (self.cor == 'azul' and y == 6) or (self.cor == 'vermelho' and y == 1):
+                        novo_y2 = y + 2 * direcao
+                        if 0 <= novo_y2 < 8 and tabuleiro[novo_y2][x] is None:
+                            movimentos.append((x, novo_y2))
+                # Captura diagonal
+                for dx in [-1, 1]:
+                    novo_x = x + dx
+                    if 0 <= novo_x < 8:
+                        peca_destino = tabuleiro[novo_y][novo_x]
+                        if peca_destino and peca_destino.cor != self.cor:
+                            movimentos.append((novo_x, novo_y))
+                        # En Passant
+                        elif peca_destino is None:
+                            # Implementação simplificada, pode ser expandida com histórico de movimentos
+                            pass
+        elif self.tipo == 'torre':
+            # Movimentos horizontais e verticais
+            direcoes = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+            for dx, dy in direcoes:
+                nx, ny = x + dx, y + dy
+                while 0 <= nx < 8 and 0 <= ny < 8:
+                    peca_destino = tabuleiro[ny][nx]
+                    if peca_destino is None:
+                        movimentos.append((nx, ny))
+                    elif peca_destino.cor != self.cor:
+                        movimentos.append((nx, ny))
+                        break
+                    else:
+                        break
+                    nx += dx
+                    ny += dy
+            # Roque
+            if self.movimentos_realizados == 0:
+                # Implementar condições de roque
+                pass
+        elif self.tipo == 'bispo':
+            # Movimentos diagonais
+            direcoes = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+            for dx, dy in direcoes:
+                nx, ny = x + dx, y + dy
+                while 0 <= nx < 8 and 0 <= ny < 8:
+                    peca_destino = tabuleiro[ny][nx]
+                    if peca_destino is None:
+                        movimentos.append((nx, ny))
+                    elif peca_destino.cor != self.cor:
+                        movimentos.append((nx, ny))
+                        break
+                    else:
+                        break
+                    nx += dx
+                    ny += dy
+        elif self.tipo == 'rainha':
+            # Combinação de torre e bispo
+            direcoes = [(-1, 0), (1, 0), (0, -1), (0, 1),
+                        (-1, -1), (-1, 1), (1, -1), (1, 1)]
+            for dx, dy in direcoes:
+                nx, ny = x + dx, y + dy
+                while 0 <= nx < 8 and 0 <= ny < 8:
+                    peca_destino = tabuleiro[ny][nx]
+                    if peca_destino is None:
+                        movimentos.append((nx, ny))
+                    elif peca_destino.cor != self.cor:
+                        movimentos.append((nx, ny))
+                        break
+                    else:
+                        break
+                    nx += dx
+                    ny += dy
+        elif self.tipo == 'rei':
+            # Movimentos para todas as direções, mas apenas uma casa
+            direcoes = [(-1, -1), (-1, 0), (-1, 1),
+                        (0, -1),         (0, 1),
+                        (1, -1),  (1, 0),  (1, 1)]
+            for dx, dy in direcoes:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < 8 and 0 <= ny < 8:
+                    peca_destino = tabuleiro[ny][nx]
+                    if peca_destino is None or peca_destino.cor != self.cor:
+                        movimentos.append((nx, ny))
+            # Roque
+            if self.movimentos_realizados == 0:
+                # Implementar condições de roque
+                pass
+        elif self.tipo == 'cavalo':
+            # Movimentos em 'L'
+            movimentos_cavalo = [
+                (x + 1, y + 2), (x + 1, y - 2),
+                (x - 1, y + 2), (x - 1, y - 2),
+                (x + 2, y + 1), (x + 2, y - 1),
+                (x - 2, y + 1), (x - 2, y - 1)
+            ]
+            for nx, ny in movimentos_cavalo:
+                if 0 <= nx < 8 and 0 <= ny < 8:
+                    peca_destino = tabuleiro[ny][nx]
+                    if peca_destino is None or peca_destino.cor != self.cor:
+                        movimentos.append((nx, ny))
+        return movimentos
+
+# Tipos de limite guardados na tabela de transposição
+EXATO, LIMITE_INFERIOR, LIMITE_SUPERIOR = 0, 1, 2
+INFINITO = 1000000
+# Mate em p meios-lances vale VALOR_MATE - p para quem aplica: mates mais rápidos valem mais
+VALOR_MATE = 100000
+LIMIAR_MATE = VALOR_MATE - 1000
+MEMORIA_TT_PADRAO_MB = 16
+PROFUNDIDADE_MAXIMA = 64
+
+# Faixas de prioridade da ordenação de movimentos (a tabela de histórico fica abaixo de ORDEM_ASSASSINO)
+ORDEM_VP = 1 << 30
+ORDEM_TT = 1 << 29
+ORDEM_CAPTURA = 1 << 28
+ORDEM_ASSASSINO = 1 << 27
+LIMITE_HISTORICO = 1 << 20
+
+# Quiescência: uma captura só é buscada se o material ganho mais esta margem ainda puder
+# levar a avaliação acima de alpha (poda delta)
+MARGEM_DELTA = 200
+GANHO_CAPTURA = [max(mg, eg) for mg, eg in zip(VALOR_MG, VALOR_EG)]
+# Poda por movimento nulo a partir desta profundidade, com redução maior nas buscas fundas
+PROFUNDIDADE_NULO = 3
+# Redução de lances tardios: os primeiros lances de cada nó sempre vão à profundidade cheia
+PROFUNDIDADE_REDUCAO = 3
+LANCES_SEM_REDUCAO = 3
+# Meia largura inicial da janela de aspiração em volta da pontuação da iteração anterior
+JANELA_ASPIRACAO = 50
+
+# Lançada de dentro da busca quando o orçamento de tempo ou de nós acaba
+class BuscaInterrompida(Exception):
+    pass
+
+# Tabela de transposição de tamanho fixo: dois arrays de 64 bits (chave e dados empacotados),
+# em baldes de duas entradas com substituição por idade e profundidade. Os dados guardam
+# pontuação (32 bits), melhor movimento (15), profundidade (7), tipo de limite (2) e idade (8).
+# O campo da chave guarda chave ^ dados: quando vários processos escrevem na mesma tabela sem
+# trava, uma entrada escrita pela metade não confere com nenhuma chave e é ignorada.
+class TabelaTransposicao:
+    def __init__(self, memoria_mb=MEMORIA_TT_PADRAO_MB):
+        entradas = max(2, int(memoria_mb * 1024 * 1024) // 16)
+        self.tamanho = 1 << (entradas.bit_length() - 1)
+        self.mascara = self.tamanho - 2  # Sempre o índice par do balde
+        self.idade = 0
+        self._alocar()
+
+    def _alocar(self):
+        self.chaves = array('Q', bytes(8 * self.tamanho))
+        self.dados = array('Q', bytes(8 * self.tamanho))
+
+    def nova_busca(self):
+        # Entradas de buscas anteriores continuam válidas, mas passam a ser substituídas primeiro
+        self.idade = (self.idade + 1) & 255
+
+    def limpar(self):
+        self._alocar()
+        self.idade = 0
+
+    def consultar(self, chave):
+        # Devolve (profundidade, tipo, pontuação, movimento) ou None
+        indice = chave & self.mascara
+        dados = self.dados[indice]
+        if self.chaves[indice] ^ dados != chave:
+            dados = self.dados[indice + 1]
+            if self.chaves[indice + 1] ^ dados != chave:
+                return None
+        return (dados >> 47) & 127, (dados >> 54) & 3, (dados & 0xFFFFFFFF) - 0x80000000, (dados >> 32) & 0x7FFF
+
+    def guardar(self, chave, profundidade, tipo, pontuacao, movimento):
+        indice = chave & self.mascara
+        chaves = self.chaves
+        dados = self.dados
+        if chaves[indice] ^ dados[indice] == chave:
+            alvo = indice
+        elif chaves[indice + 1] ^ dados[indice + 1] == chave:
+            alvo = indice + 1
+        else:
+            # Sobrescreve de preferência uma entrada de busca antiga; entre iguais, a mais rasa
+            antiga0 = (dados[indice] >> 56) != self.idade
+            antiga1 = (dados[indice + 1] >> 56) != self.idade
+            if antiga0 != antiga1:
+                alvo = indice if antiga0 else indice + 1
+            elif (dados[indice] >> 47) & 127 <= (dados[indice + 1] >> 47) & 127:
+                alvo = indice
+            else:
+                alvo = indice + 1
+        if not movimento and chaves[alvo] ^ dados[alvo] == chave:
+            # Não perde o melhor movimento conhecido da posição
+            movimento = (dados[alvo] >> 32) & 0x7FFF
+        dado = ((pontuacao + 0x80000000) | (movimento << 32) | (min(profundidade, 127) << 47) |
+                (tipo << 54) | (self.idade << 56))
+        chaves[alvo] = chave ^ dado
+        dados[alvo] = dado
+
+def fator_ramificacao_efetivo(nos_iteracoes):
+    # Média geométrica da razão entre os nós de iterações consecutivas (os nós de cada iteração)
+    nos = [quantidade for quantidade in nos_iteracoes if quantidade]
+    if len(nos) < 2:
+        return 0.0
+    return (nos[-1] / nos[0]) ** (1 / (len(nos) - 1))
+
+# Estatísticas de uma busca, coletadas só quando o jogo tem um coletor (Jogo.estatisticas): sem
+# ele a busca paga um teste de None nos pontos contados. Os nós totais são os do próprio jogo.
+class EstatisticasBusca:
+    def __init__(self):
+        self.iniciar()
+
+    def iniciar(self):
+        self.nos = 0
+        self.nos_quiescencia = 0
+        self.cortes = 0  # Cortes beta na lista de movimentos
+        self.cortes_primeiro = 0  # ...dos quais no primeiro movimento tentado
+        self.cortes_nulo = 0
+        self.consultas_tt = 0
+        self.acertos_tt = 0  # Consultas que acharam a posição
+        self.cortes_tt = 0  # Acertos que encerraram o nó sem busca
+        self.consultas_finais = 0  # Posições resolvidas pelas tabelas de finais
+        self.iteracoes = []  # Um dicionário por iteração completa
+        self.tempo = 0.0
+
+    def registrar_iteracao(self, profundidade, pontuacao, nos, tempo):
+        # nos e tempo acumulados desde o início da busca; a iteração guarda só os dela
+        anterior = self.iteracoes[-1] if self.iteracoes else {'nos_total': 0, 'tempo_total': 0.0}
+        self.iteracoes.append({
+            'profundidade': profundidade, 'pontuacao': pontuacao,
+            'nos': nos - anterior['nos_total'], 'tempo': tempo - anterior['tempo_total'],
+            'nos_total': nos, 'tempo_total': tempo,
+        })
+
+    def finalizar(self, nos, tempo):
+        self.nos = nos
+        self.tempo = tempo
+
+    def taxa_primeiro_corte(self):
+        return self.cortes_primeiro / self.cortes if self.cortes else 0.0
+
+    def taxa_acertos_tt(self):
+        return self.acertos_tt / self.consultas_tt if self.consultas_tt else 0.0
+
+    def nos_por_segundo(self):
+        return self.nos / self.tempo if self.tempo else 0.0
+
+    def fator_ramificacao(self):
+        return fator_ramificacao_efetivo([iteracao['nos'] for iteracao in self.iteracoes])
+
+    def como_dicionario(self):
+        return {
+            'nos': self.nos, 'nos_quiescencia': self.nos_quiescencia, 'tempo': round(self.tempo, 4),
+            'nps': round(self.nos_por_segundo()), 'cortes': self.cortes, 'cortes_primeiro': self.cortes_primeiro,
+            'taxa_primeiro_corte': round(self.taxa_primeiro_corte(), 4), 'cortes_nulo': self.cortes_nulo,
+            'consultas_tt': self.consultas_tt, 'acertos_tt': self.acertos_tt, 'cortes_tt': self.cortes_tt,
+            'taxa_acertos_tt': round(self.taxa_acertos_tt(), 4), 'consultas_finais': self.consultas_finais,
+            'fator_ramificacao': round(self.fator_ramificacao(), 3),
+            'iteracoes': [{chave: round(valor, 4) if isinstance(valor, float) else valor
+                           for chave, valor in iteracao.items()} for iteracao in self.iteracoes],
+        }
+
+    def resumo(self):
+        # Linhas curtas para painéis e relatórios
+        profundidade = self.iteracoes[-1]['profundidade'] if self.iteracoes else 0
+        return [
+            f'Prof. {profundidade} | {self.nos} nós | {self.nos_por_segundo():.0f} nós/s',
+            f'Quiesc. {self.nos_quiescencia} | cortes {self.cortes} ({100 * self.taxa_primeiro_corte():.0f}% no 1º)',
+            f'TT {100 * self.taxa_acertos_tt():.0f}% ({self.cortes_tt} cortes) | EBF {self.fator_ramificacao():.2f} | '
+            f'{self.tempo:.2f} s',
+        ]
+
+    def registrar_json(self, arquivo, **extras):
+        # Acrescenta a busca como uma linha JSON (JSON Lines) a um arquivo já aberto
+        dados = dict(extras)
+        dados.update(self.como_dicionario())
+        arquivo.write(json.dumps(dados, ensure_ascii=False) + '\n')
+
+
+# Classe para representar o estado do jogo
+class Jogo:
+    def __init__(self, memoria_tt_mb=MEMORIA_TT_PADRAO_MB):
+        self.tabuleiro = [[None for _ in range(8)] for _ in range(8)]
+        self.lado = 0  # Índice da cor que joga (0 = azul, 1 = vermelho)
+        self.historico = []  # Lista para armazenar o histórico de movimentos
+        # A partida em forma estruturada, para FEN e PGN: posição de partida e (movimento, SAN)
+        # de cada lance feito por mover_peca
+        self.fen_inicial = FEN_INICIAL
+        self.lances_partida = []
+        self.direitos_roque = ROQUE_AZUL_MAIS | ROQUE_AZUL_MENOS | ROQUE_VERMELHO_MAIS | ROQUE_VERMELHO_MENOS
+        self.contador_lances = 0  # Meios-lances jogados
+        self.lances_sem_captura = 0  # Meios-lances desde a última captura ou movimento de peão
+        self.pilha_desfazer = []  # Um registro por movimento feito, consumido por desfazer_movimento
+        # Mantida entre os turnos: a busca seguinte reaproveita o que a anterior encontrou
+        self.tabela_transposicao = TabelaTransposicao(memoria_tt_mb)
+        # Controle da busca: contagem de nós e limites do aprofundamento iterativo
+        self.nos = 0
+        self.prazo = None
+        self.limite_nos = None
+        self.interrompivel = False
+        self.parar = False  # Pedido de parada vindo de fora da busca (comando stop, interface)
+        # Limites (prazo, nós) impostos de outra thread a uma busca em andamento; a própria busca
+        # os aplica, para que a inicialização dela não apague um limite que chegou cedo demais
+        self.limites_pendentes = None
+        self.trava_limites = threading.Lock()
+        self.variacao_principal = []  # Movimentos codificados da última iteração completa
+        self.seguindo_vp = False
+        # Tabela triangular da variação principal: a linha de cada ply, montada de baixo para cima
+        self.tabela_vp = [()] * (PROFUNDIDADE_MAXIMA + 2)
+        # Ordenação de movimentos: dois movimentos assassinos por ply e histórico por lado
+        self.ordenar_movimentos = True
+        self.usar_quiescencia = True
+        self.usar_movimento_nulo = True
+        self.usar_reducoes = True
+        self.usar_pvs = True
+        self.usar_aspiracao = True
+        self.nos_iteracoes = []  # Nós gastos em cada iteração completa da última busca
+        self.livro = None  # Livro de aberturas consultado antes de cada busca (ver livro_aberturas.py)
+        self.finais = None  # Tabelas de finais consultadas dentro da busca (ver tabelas_finais.py)
+        self.estatisticas = None  # Coletor de estatísticas da busca (EstatisticasBusca), opcional
+        self.assassinos = [[0, 0] for _ in range(PROFUNDIDADE_MAXIMA + 1)]
+        self.tabela_historico = [[0] * 4096, [0] * 4096]
+        self.iniciar_tabuleiro()
+        self.sincronizar_bitboards()
+
+    @property
+    def jogador_atual(self):
+        return CORES[self.lado]
+
+    @jogador_atual.setter
+    def jogador_atual(self, cor):
+        if INDICE_COR[cor] != self.lado:
+            self.lado = INDICE_COR[cor]
+            self.hash ^= ZOBRIST_LADO
+
+    @property
+    def roque_disponivel(self):
+        # Visão em dicionário dos direitos de roque, no formato usado por Peca.movimentos_validos
+        return {
+            'azul': {'roque_menos': bool(self.direitos_roque & ROQUE_AZUL_MENOS),
+                     'roque_mais': bool(self.direitos_roque & ROQUE_AZUL_MAIS)},
+            'vermelho': {'roque_menos': bool(self.direitos_roque & ROQUE_VERMELHO_MENOS),
+                         'roque_mais': bool(self.direitos_roque & ROQUE_VERMELHO_MAIS)}
+        }
+
+    def iniciar_tabuleiro(self):
+        # Peças azuis (jogador humano)
+        self.tabuleiro[6] = [Peca('peao', 'azul') for _ in range(8)]
+        self.tabuleiro[7][0] = Peca('torre', 'azul')
+        self.tabuleiro[7][1] = Peca('cavalo', 'azul')
+        self.tabuleiro[7][2] = Peca('bispo', 'azul')
+        self.tabuleiro[7][3] = Peca('rainha', 'azul')
+        self.tabuleiro[7][4] = Peca('rei', 'azul')
+        self.tabuleiro[7][5] = Peca('bispo', 'azul')
+        self.tabuleiro[7][6] = Peca('cavalo', 'azul')
+        self.tabuleiro[7][7] = Peca('torre', 'azul')
+
+        # Peças vermelhas (IA)
+        self.tabuleiro[1] = [Peca('peao', 'vermelho') for _ in range(8)]
+        self.tabuleiro[0][0] = Peca('torre', 'vermelho')
+        self.tabuleiro[0][1] = Peca('cavalo', 'vermelho')
+        self.tabuleiro[0][2] = Peca('bispo', 'vermelho')
+        self.tabuleiro[0][3] = Peca('rainha', 'vermelho')
+        self.tabuleiro[0][4] = Peca('rei', 'vermelho')
+        self.tabuleiro[0][5] = Peca('bispo', 'vermelho')
+        self.tabuleiro[0][6] = Peca('cavalo', 'vermelho')
+        self.tabuleiro[0][7] = Peca('torre', 'vermelho')
+
+    def sincronizar_bitboards(self):
+        # Reconstrói os bitboards (um por peça de cada cor) e o vetor de casas a partir do tabuleiro
+        self.bitboards = [0] * 12
+        self.ocupacao_cor = [0, 0]
+        self.casas = [VAZIO] * 64
+        self.casa_rei = [-1, -1]  # Casa de cada rei (-1 sem rei), mantida por fazer_movimento
+        for y in range(8):
+            for x in range(8):
+                peca = self.tabuleiro[y][x]
+                if peca:
+                    lado = INDICE_COR[peca.cor]
+                    codigo = lado * 6 + INDICE_TIPO[peca.tipo]
+                    self.bitboards[codigo] |= 1 << (y * 8 + x)
+                    self.ocupacao_cor[lado] |= 1 << (y * 8 + x)
+                    self.casas[y * 8 + x] = codigo
+                    if codigo % 6 == REI:
+                        self.casa_rei[lado] = y * 8 + x
+        self.hash = self.calcular_hash()
+        self.avaliacao_mg, self.avaliacao_eg, self.fase = self.calcular_avaliacao()
+
+    def calcular_avaliacao(self):
+        # Somas completas de meio-jogo, final e fase; durante o jogo são mantidas incrementalmente
+        avaliacao_mg = avaliacao_eg = fase = 0
+        for casa, codigo in enumerate(self.casas):
+            if codigo != VAZIO:
+                avaliacao_mg += AVALIACAO_MG[codigo * 64 + casa]
+                avaliacao_eg += AVALIACAO_EG[codigo * 64 + casa]
+                fase += FASE_CODIGO[codigo]
+        return avaliacao_mg, avaliacao_eg, fase
+
+    def carregar_fen(self, fen):
+        # Monta a posição descrita em FEN (peças, vez, roque e contadores)
+        campos = fen.split()
+        self.tabuleiro = [[None for _ in range(8)] for _ in range(8)]
+        for y, linha in enumerate(campos[0].split('/')):
+            x = 0
+            for letra in linha:
+                if letra.isdigit():
+                    x += int(letra)
+                else:
+                    self.tabuleiro[y][x] = Peca(LETRAS_FEN[letra.lower()], 'azul' if letra.isupper() else 'vermelho')
+                    x += 1
+        self.lado = 0 if len(campos) < 2 or campos[1] == 'w' else 1
+        roque = campos[2] if len(campos) > 2 else '-'
+        self.direitos_roque = ((ROQUE_AZUL_MAIS if 'K' in roque else 0) | (ROQUE_AZUL_MENOS if 'Q' in roque else 0) |
+                               (ROQUE_VERMELHO_MAIS if 'k' in roque else 0) | (ROQUE_VERMELHO_MENOS if 'q' in roque else 0))
+        self.lances_sem_captura = int(campos[4]) if len(campos) > 4 else 0
+        self.contador_lances = (int(campos[5]) - 1) * 2 + self.lado if len(campos) > 5 else self.lado
+        self.pilha_desfazer = []
+        self.historico = []
+        self.sincronizar_bitboards()
+        self.fen_inicial = self.gerar_fen()
+        self.lances_partida = []
+
+    def gerar_fen(self):
+        # FEN da posição atual; o campo de en passant é sempre '-', porque o jogo não o tem
+        linhas = []
+        for y in range(8):
+            linha = ''
+            vazias = 0
+            for codigo in self.casas[y * 8:y * 8 + 8]:
+                if codigo == VAZIO:
+                    vazias += 1
+                    continue
+                if vazias:
+                    linha += str(vazias)
+                    vazias = 0
+                letra = 'pnbrqk'[codigo % 6]
+                linha += letra if codigo // 6 else letra.upper()
+            linhas.append(linha + (str(vazias) if vazias else ''))
+        roque = ''.join(letra for bit, letra in ((ROQUE_AZUL_MAIS, 'K'), (ROQUE_AZUL_MENOS, 'Q'),
+                                                 (ROQUE_VERMELHO_MAIS, 'k'), (ROQUE_VERMELHO_MENOS, 'q'))
+                        if self.direitos_roque & bit)
+        return (f"{'/'.join(linhas)} {'wb'[self.lado]} {roque or '-'} - {self.lances_sem_captura} "
+                f"{self.contador_lances // 2 + 1}")
+
+    def calcular_hash(self):
+        # Chave de Zobrist completa da posição; durante o jogo ela é mantida incrementalmente
+        chave = ZOBRIST_ROQUE[self.direitos_roque]
+        if self.lado:
+            chave ^= ZOBRIST_LADO
+        for casa, codigo in enumerate(self.casas):
+            if codigo != VAZIO:
+                chave ^= ZOBRIST_PECAS[codigo][casa]
+        return chave
+
+    def mover_peca(self, origem, destino, promocao=None, is_ai_move=False, eval_score=None, variacao=None):
+        x1, y1 = origem
+        x2, y2 = destino
+        peca = self.tabuleiro[y1][x1]
+        destino_peca = self.tabuleiro[y2][x2]
+        self.tabuleiro[y2][x2] = peca
+        self.tabuleiro[y1][x1] = None
+        peca.movimentos_realizados += 1
+
+        # Promoção de peão
+        if peca.tipo == 'peao' and (y2 == 0 or y2 == 7):
+            if promocao:
+                self.tabuleiro[y2][x2] = Peca(promocao, peca.cor)
+            else:
+                self.promocao_peao(x2, y2, peca.cor)
+            promocao = self.tabuleiro[y2][x2].tipo
+        else:
+            promocao = None
+        # Bitboards, direitos de roque e contadores; a notação sai antes, da posição de origem
+        movimento = codificar_movimento(origem, destino, promocao)
+        san = self.san_movimento(movimento)
+        self.fazer_movimento(movimento)
+        self.lances_partida.append((movimento, san))
+
+        # Adicionar movimento ao histórico
+        if is_ai_move:
+            descricao = f"IA move {peca.tipo.capitalize()} de ({x1},{y1}) para ({x2},{y2}) | Eval: {eval_score}"
+            if variacao:
+                # Variação principal da busca que escolheu o lance, a começar por ele
+                descricao += ' | VP: ' + ' '.join(movimento_uci(movimento) for movimento in variacao)
+            self.registrar_historico('vermelho', descricao)
+        else:
+            descricao = f"Jogador move {peca.tipo.capitalize()} de ({x1},{y1}) para ({x2},{y2})"
+            self.registrar_historico('azul', descricao)
+
+    def registrar_historico(self, cor, descricao):
+        # Ponto de extensão: a interface gráfica também prepara aqui o desenho da entrada
+        self.historico.append((cor, descricao))
+
+    def fazer_movimento(self, movimento):
+        # Joga um movimento codificado no próprio objeto (sem cópias) e empilha o que for
+        # preciso para desfazê-lo: peça capturada, direitos de roque, relógio de meios-lances, hash
+        # e as somas da avaliação, que também são atualizadas aqui.
+        # Não mexe no tabuleiro de objetos Peca, que é atualizado por mover_peca.
+        origem = movimento & 63
+        destino = (movimento >> 6) & 63
+        promocao = movimento >> 12
+        bit_origem = 1 << origem
+        bit_destino = 1 << destino
+        casas = self.casas
+        bitboards = self.bitboards
+        peca = casas[origem]
+        capturada = casas[destino]
+        lado = peca // 6
+        self.pilha_desfazer.append((movimento, capturada, self.direitos_roque, self.lances_sem_captura, self.hash,
+                                    self.avaliacao_mg, self.avaliacao_eg, self.fase))
+        nova = lado * 6 + promocao if promocao else peca
+        chave = self.hash ^ ZOBRIST_PECAS[peca][origem] ^ ZOBRIST_PECAS[nova][destino] ^ ZOBRIST_LADO
+        self.avaliacao_mg += AVALIACAO_MG[nova * 64 + destino] - AVALIACAO_MG[peca * 64 + origem]
+        self.avaliacao_eg += AVALIACAO_EG[nova * 64 + destino] - AVALIACAO_EG[peca * 64 + origem]
+        if promocao:
+            self.fase += FASE_TIPO[promocao]
+        if capturada != VAZIO:
+            chave ^= ZOBRIST_PECAS[capturada][destino]
+            self.avaliacao_mg -= AVALIACAO_MG[capturada * 64 + destino]
+            self.avaliacao_eg -= AVALIACAO_EG[capturada * 64 + destino]
+            self.fase -= FASE_CODIGO[capturada]
+            bitboards[capturada] ^= bit_destino
+            self.ocupacao_cor[lado ^ 1] ^= bit_destino
+            self.lances_sem_captura = 0
+        elif peca % 6 == PEAO:
+            self.lances_sem_captura = 0
+        else:
+            self.lances_sem_captura += 1
+        bitboards[peca] ^= bit_origem
+        bitboards[nova] |= bit_destino
+        self.ocupacao_cor[lado] ^= bit_origem | bit_destino
+        casas[origem] = VAZIO
+        casas[destino] = nova
+        if peca % 6 == REI:
+            self.casa_rei[lado] = destino
+        roque = self.direitos_roque & MASCARA_ROQUE[origem] & MASCARA_ROQUE[destino]
+        if roque != self.direitos_roque:
+            chave ^= ZOBRIST_ROQUE[self.direitos_roque] ^ ZOBRIST_ROQUE[roque]
+            self.direitos_roque = roque
+        self.hash = chave
+        self.contador_lances += 1
+        self.lado = lado ^ 1
+
+    def desfazer_movimento(self):
+        # Desfaz o último movimento de fazer_movimento, deixando o estado idêntico ao anterior
+        (movimento, capturada, self.direitos_roque, self.lances_sem_captura, self.hash,
+         self.avaliacao_mg, self.avaliacao_eg, self.fase) = self.pilha_desfazer.pop()
+        origem = movimento & 63
+        destino = (movimento >> 6) & 63
+        bit_origem = 1 << origem
+        bit_destino = 1 << destino
+        casas = self.casas
+        bitboards = self.bitboards
+        nova = casas[destino]
+        lado = nova // 6
+        peca = lado * 6 + PEAO if movimento >> 12 else nova
+        bitboards[nova] ^= bit_destino
+        bitboards[peca] |= bit_origem
+        self.ocupacao_cor[lado] ^= bit_origem | bit_destino
+        if capturada != VAZIO:
+            bitboards[capturada] |= bit_destino
+            self.ocupacao_cor[lado ^ 1] |= bit_destino
+        casas[origem] = peca
+        casas[destino] = capturada
+        if peca % 6 == REI:
+            self.casa_rei[lado] = origem
+        self.contador_lances -= 1
+        self.lado = lado
+
+    def fazer_movimento_nulo(self):
+        # Passa a vez sem mover (poda por movimento nulo). Nada vai para a pilha: dentro da busca
+        # há sempre um movimento de verdade antes dele, e desfazê-lo restaura lado e hash
+        self.lado ^= 1
+        self.hash ^= ZOBRIST_LADO
+
+    def desfazer_movimento_nulo(self):
+        self.lado ^= 1
+        self.hash ^= ZOBRIST_LADO
+
+    def promocao_peao(self, x, y, cor):
+        # Sem interface não há a quem perguntar: promove para rainha. A interface gráfica
+        # sobrescreve este método com o prompt de escolha
+        self.tabuleiro[y][x] = Peca('rainha', cor)
+
+    def esta_em_xeque(self, cor):
+        # Verifica se o rei da cor especificada está em xeque
+        lado = INDICE_COR[cor]
+        casa_rei = self.casa_rei[lado]
+        if casa_rei < 0:
+            return False  # Rei foi capturado
+        return self._atacada_por(casa_rei, lado ^ 1, self.ocupacao_cor[0] | self.ocupacao_cor[1])
+
+    def casa_atacada(self, casa, cor):
+        # Verifica se a casa (x, y) é atacada por alguma peça da cor especificada
+        x, y = casa
+        return self._atacada_por(y * 8 + x, INDICE_COR[cor], self.ocupacao_cor[0] | self.ocupacao_cor[1])
+
+    def _atacada_por(self, casa, lado, ocupacao, manter=-1):
+        # Sonda a partir da própria casa: uma peça do lado a ataca se estiver numa das casas de
+        # onde uma peça do mesmo tipo, saindo daqui, a alcançaria. `ocupacao` e `manter` (peças
+        # que continuam no tabuleiro) permitem consultar a posição depois de um movimento.
+        bitboards = self.bitboards
+        base = lado * 6
+        if ATAQUES_CAVALO[casa] & bitboards[base + CAVALO] & manter:
+            return True
+        if ATAQUES_PEAO[lado ^ 1][casa] & bitboards[base + PEAO] & manter:
+            return True
+        if ATAQUES_REI[casa] & bitboards[base + REI]:
+            return True
+        rainhas = bitboards[base + RAINHA]
+        if ataques_bispo(casa, ocupacao) & (bitboards[base + BISPO] | rainhas) & manter:
+            return True
+        return bool(ataques_torre(casa, ocupacao) & (bitboards[base + TORRE] | rainhas) & manter)
+
+    def esta_em_xeque_mate(self, cor):
+        if not self.esta_em_xeque(cor):
+            return False
+        # Verifica se há algum movimento que tira o rei do xeque
+        return not self._movimentos_legais(INDICE_COR[cor])
+
+    def obter_movimentos_validos(self, cor):
+        return [decodificar_movimento(movimento) for movimento in self._movimentos_legais(INDICE_COR[cor])]
+
+    def movimento_san(self, texto):
+        # Movimento codificado a partir da notação algébrica (Nf3, exd5, e8=Q+, Raxd1);
+        # ValueError se o lance não for legal na posição ou for ambíguo
+        san = texto.rstrip('+#!?')
+        if san.startswith('O-O') or san.startswith('0-0'):
+            raise ValueError(f'Roque não existe neste jogo: {texto}')
+        promocao = 0
+        if '=' in san:
+            san, letra = san.split('=')
+            promocao = TIPO_SAN.get(letra.upper(), 0)
+        elif san[-1:] in 'NBRQ' and san[-2:-1].isdigit():
+            promocao = TIPO_SAN[san[-1]]  # Promoção escrita sem o sinal de igual (e8Q)
+            san = san[:-1]
+        tipo = TIPO_SAN.get(san[:1], PEAO)
+        if tipo != PEAO:
+            san = san[1:]
+        san = san.replace('x', '').replace('-', '')
+        if len(san) < 2 or san[-2] not in 'abcdefgh' or san[-1] not in '12345678':
+            raise ValueError(f'Lance SAN inválido: {texto}')
+        destino = (8 - int(san[-1])) * 8 + 'abcdefgh'.index(san[-2])
+        desambiguacao = san[:-2]
+        candidatos = []
+        for movimento in self._movimentos_legais(self.lado):
+            origem = movimento & 63
+            if ((movimento >> 6) & 63 != destino or self.casas[origem] % 6 != tipo or movimento >> 12 != promocao):
+                continue
+            nome = nome_casa(origem)
+            if all(letra in nome for letra in desambiguacao):
+                candidatos.append(movimento)
+        if len(candidatos) != 1:
+            raise ValueError(f'Lance SAN {"ambíguo" if candidatos else "ilegal"}: {texto}')
+        return candidatos[0]
+
+    def san_movimento(self, movimento):
+        # Notação algébrica de um movimento legal na posição atual (o inverso de movimento_san):
+        # letra da peça, coluna ou linha de origem só quando outra peça igual alcança o destino,
+        # captura, promoção e xeque ou mate
+        origem = movimento & 63
+        destino = (movimento >> 6) & 63
+        tipo = self.casas[origem] % 6
+        captura = 'x' if self.casas[destino] != VAZIO else ''
+        if tipo == PEAO:
+            san = (nome_casa(origem)[0] + captura if captura else '') + nome_casa(destino)
+            if movimento >> 12:
+                san += '=' + LETRA_SAN[movimento >> 12]
+        else:
+            nome = nome_casa(origem)
+            rivais = [nome_casa(outro & 63) for outro in self._movimentos_legais(self.lado)
+                      if (outro >> 6) & 63 == destino and outro & 63 != origem and self.casas[outro & 63] % 6 == tipo]
+            if not rivais:
+                desambiguacao = ''
+            elif all(rival[0] != nome[0] for rival in rivais):
+                desambiguacao = nome[0]
+            elif all(rival[1] != nome[1] for rival in rivais):
+                desambiguacao = nome[1]
+            else:
+                desambiguacao = nome
+            san = LETRA_SAN[tipo] + desambiguacao + captura + nome_casa(destino)
+        self.fazer_movimento(movimento)
+        if self.esta_em_xeque(CORES[self.lado]):
+            san += '+' if self._movimentos_legais(self.lado) else '#'
+        self.desfazer_movimento()
+        return san
+
+    def _movimentos_legais(self, lado, apenas_capturas=False):
+        # Gerador estritamente legal: os xeques e as peças cravadas são calculados uma vez por
+        # posição e só saem movimentos que não deixam o rei em xeque, sem testar um a um.
+        # Com apenas_capturas (quiescência) saem só capturas e promoções a rainha.
+        casa_rei = self.casa_rei[lado]
+        if casa_rei < 0:
+            return self._gerar_movimentos(lado)  # Sem rei não há o que proteger
+        movimentos = []
+        bitboards = self.bitboards
+        proprias = self.ocupacao_cor[lado]
+        inimigas = self.ocupacao_cor[lado ^ 1]
+        ocupacao = proprias | inimigas
+        livres = inimigas if apenas_capturas else ~proprias & TODAS_CASAS
+        base = lado * 6
+        inimigo = (lado ^ 1) * 6
+
+        # Peças que dão xeque e peças cravadas: as deslizantes inimigas que veriam o rei se as
+        # peças próprias fossem transparentes dão xeque (nada entre elas e o rei) ou cravam a
+        # única peça própria no caminho, que só pode andar entre o rei e a cravadora
+        xeques = ((ATAQUES_CAVALO[casa_rei] & bitboards[inimigo + CAVALO]) |
+                  (ATAQUES_PEAO[lado][casa_rei] & bitboards[inimigo + PEAO]))
+        rainhas = bitboards[inimigo + RAINHA]
+        deslizantes = ((ataques_torre(casa_rei, inimigas) & (bitboards[inimigo + TORRE] | rainhas)) |
+                       (ataques_bispo(casa_rei, inimigas) & (bitboards[inimigo + BISPO] | rainhas)))
+        cravadas = 0
+        cravacoes = {}
+        while deslizantes:
+            bit = deslizantes & -deslizantes
+            deslizantes ^= bit
+            entre = ENTRE[casa_rei][bit.bit_length() - 1]
+            bloqueio = entre & ocupacao
+            if not bloqueio:
+                xeques |= bit
+            elif not bloqueio & (bloqueio - 1):
+                cravadas |= bloqueio
+                cravacoes[bloqueio] = entre | bit
+
+        # Rei: a casa de destino não pode estar atacada, olhando através da casa que ele deixa
+        ocupacao_sem_rei = ocupacao ^ (1 << casa_rei)
+        alvos = ATAQUES_REI[casa_rei] & livres
+        while alvos:
+            bit = alvos & -alvos
+            alvos ^= bit
+            destino = bit.bit_length() - 1
+            if not self._atacada_por(destino, lado ^ 1, ocupacao_sem_rei, ~bit):
+                movimentos.append(casa_rei | (destino << 6))
+        if xeques & (xeques - 1):
+            return movimentos  # Xeque duplo: só o rei pode se mover
+        if xeques:
+            # Xeque simples: capturar a peça que dá xeque ou bloquear o caminho dela
+            permitidas = xeques | ENTRE[casa_rei][xeques.bit_length() - 1]
+        else:
+            permitidas = TODAS_CASAS
+
+        promocao = LINHA_PROMOCAO[lado]
+        if apenas_capturas:
+            permitidas_peoes = permitidas & (inimigas | promocao)
+            tipos_promocao = (RAINHA,)
+        else:
+            permitidas_peoes = permitidas
+            tipos_promocao = PROMOCOES
+        for destinos, recuo in destinos_peoes(lado, bitboards[base + PEAO], ~ocupacao & TODAS_CASAS, inimigas):
+            destinos &= permitidas_peoes
+            while destinos:
+                bit = destinos & -destinos
+                destinos ^= bit
+                destino = bit.bit_length() - 1
+                origem = destino + recuo
+                if cravadas and cravadas & (1 << origem) and not cravacoes[1 << origem] & bit:
+                    continue
+                movimento = origem | (destino << 6)
+                if bit & promocao:
+                    for tipo in tipos_promocao:
+                        movimentos.append(movimento | (tipo << 12))
+                else:
+                    movimentos.append(movimento)
+
+        for tipo in (CAVALO, BISPO, TORRE, RAINHA):
+            pecas = bitboards[base + tipo]
+            while pecas:
+                bit = pecas & -pecas
+                pecas ^= bit
+                origem = bit.bit_length() - 1
+                alvos = ataques_peca(tipo, origem, ocupacao) & livres & permitidas
+                if cravadas & bit:
+                    alvos &= cravacoes[bit]
+                while alvos:
+                    bit_alvo = alvos & -alvos
+                    alvos ^= bit_alvo
+                    movimentos.append(origem | ((bit_alvo.bit_length() - 1) << 6))
+        return movimentos
+
+    def _gerar_movimentos(self, lado):
+        # Movimentos pseudo-legais (ainda podem deixar o próprio rei em xeque) a partir dos bitboards;
+        # com o filtro de _movimento_legal serve de referência para o gerador legal
+        movimentos = []
+        proprias = self.ocupacao_cor[lado]
+        inimigas = self.ocupacao_cor[lado ^ 1]
+        ocupacao = proprias | inimigas
+        vazias = ~ocupacao & TODAS_CASAS
+        livres = ~proprias & TODAS_CASAS
+        base = lado * 6
+
+        # Peões
+        promocao = LINHA_PROMOCAO[lado]
+        for destinos, recuo in destinos_peoes(lado, self.bitboards[base + PEAO], vazias, inimigas):
+            while destinos:
+                bit = destinos & -destinos
+                destinos ^= bit
+                destino = bit.bit_length() - 1
+                movimento = (destino + recuo) | (destino << 6)
+                if bit & promocao:
+                    for tipo in PROMOCOES:
+                        movimentos.append(movimento | (tipo << 12))
+                else:
+                    movimentos.append(movimento)
+
+        # Demais peças: tabelas de ataque filtradas pelas casas livres
+        for tipo in (CAVALO, BISPO, TORRE, RAINHA, REI):
+            pecas = self.bitboards[base + tipo]
+            while pecas:
+                bit = pecas & -pecas
+                pecas ^= bit
+                origem = bit.bit_length() - 1
+                alvos = ataques_peca(tipo, origem, ocupacao) & livres
+                while alvos:
+                    bit_alvo = alvos & -alvos
+                    alvos ^= bit_alvo
+                    movimentos.append(origem | ((bit_alvo.bit_length() - 1) << 6))
+        return movimentos
+
+    def _movimento_legal(self, movimento, lado):
+        # Testa o movimento sobre a ocupação resultante, sem copiar nem alterar o jogo
+        origem = movimento & 63
+        destino = (movimento >> 6) & 63
+        bit_destino = 1 << destino
+        ocupacao = ((self.ocupacao_cor[0] | self.ocupacao_cor[1]) ^ (1 << origem)) | bit_destino
+        casa_rei = self.casa_rei[lado]
+        if casa_rei == origem:
+            casa_rei = destino
+        return not self._atacada_por(casa_rei, lado ^ 1, ocupacao, ~bit_destino)
+
+    def perft(self, profundidade):
+        # Número de folhas da árvore de movimentos legais até a profundidade (verificação e
+        # medida de velocidade do gerador); o último nível só conta a lista de movimentos
+        movimentos = self._movimentos_legais(self.lado)
+        if profundidade <= 1:
+            return len(movimentos) if profundidade == 1 else 1
+        total = 0
+        for movimento in movimentos:
+            self.fazer_movimento(movimento)
+            total += self.perft(profundidade - 1)
+            self.desfazer_movimento()
+        return total
+
+    def divide(self, profundidade):
+        # perft separado por movimento da raiz (em notação de coordenadas), para localizar
+        # uma divergência comparando com outro gerador
+        resultado = {}
+        for movimento in self._movimentos_legais(self.lado):
+            self.fazer_movimento(movimento)
+            resultado[movimento_uci(movimento)] = self.perft(profundidade - 1)
+            self.desfazer_movimento()
+        return resultado
+
+    def avaliar_tabuleiro(self):
+        # Função de avaliação para a IA: interpola as somas incrementais de meio-jogo e final
+        # pela fase (24 com todas as peças, 0 só com reis e peões)
+        fase = min(self.fase, FASE_TOTAL)
+        return (self.avaliacao_mg * fase + self.avaliacao_eg * (FASE_TOTAL - fase)) // FASE_TOTAL
+
+    def valor_peca(self, peca):
+        return VALORES_PECAS.get(peca.tipo, 0)
+
+    def minimax(self, profundidade, maximizando, alpha=float('-inf'), beta=float('inf')):
+        # Busca para o vermelho (maximizando) ou para o azul; a pontuação é sempre do ponto de
+        # vista do vermelho e o melhor movimento vem no formato de obter_movimentos_validos
+        self.jogador_atual = 'vermelho' if maximizando else 'azul'
+        self._preparar_busca()
+        self.interrompivel = False
+        self.seguindo_vp = False
+        alpha = int(max(alpha, -INFINITO))
+        beta = int(min(beta, INFINITO))
+        self.melhor_movimento_raiz = 0
+        if maximizando:
+            pontuacao = self._negamax(profundidade, alpha, beta, 0)
+        else:
+            pontuacao = -self._negamax(profundidade, -beta, -alpha, 0)
+        if not self.melhor_movimento_raiz:
+            return pontuacao, None
+        return pontuacao, decodificar_movimento(self.melhor_movimento_raiz)
+
+    def busca_iterativa(self, tempo_limite=None, limite_nos=None, profundidade_maxima=PROFUNDIDADE_MAXIMA,
+                        profundidade_inicial=1):
+        # Aprofundamento iterativo para quem joga: profundidades 1, 2, 3... até acabar o tempo
+        # (segundos) ou o orçamento de nós. Devolve o resultado da última iteração completa no
+        # mesmo formato de minimax; a primeira iteração sempre termina.
+        inicio = time.time()
+        self.prazo = inicio + tempo_limite if tempo_limite else None
+        self.limite_nos = limite_nos
+        self._aplicar_limites_pendentes()
+        self._preparar_busca()
+        self.variacao_principal = []
+        self.nos_iteracoes = []
+        estatisticas = self.estatisticas
+        if estatisticas is not None:
+            estatisticas.iniciar()
+        tamanho_pilha = len(self.pilha_desfazer)
+        resultado = (self.avaliar_tabuleiro(), None)
+        sinal = 1 if self.lado else -1  # A busca pontua para quem joga e o resultado é do vermelho
+        if self.livro is not None:
+            # Lance de livro: sai na hora, com a avaliação estática
+            movimento = self.livro.escolher(self)
+            if movimento:
+                self.variacao_principal = [movimento]
+                return resultado[0], decodificar_movimento(movimento)
+        anterior = None
+        for profundidade in range(profundidade_inicial, profundidade_maxima + 1):
+            self.interrompivel = profundidade > profundidade_inicial
+            self.melhor_movimento_raiz = 0
+            nos_antes = self.nos
+            try:
+                pontuacao = self._buscar_raiz(profundidade, anterior)
+            except BuscaInterrompida:
+                # A exceção atravessa a árvore sem desfazer os movimentos: desfaz aqui
+                while len(self.pilha_desfazer) > tamanho_pilha:
+                    self.desfazer_movimento()
+                break
+            if not self.melhor_movimento_raiz:
+                resultado = (sinal * pontuacao, None)
+                break
+            self.nos_iteracoes.append(self.nos - nos_antes)
+            self.variacao_principal = list(self.tabela_vp[0]) or [self.melhor_movimento_raiz]
+            anterior = pontuacao
+            resultado = (sinal * pontuacao, decodificar_movimento(self.melhor_movimento_raiz))
+            if estatisticas is not None:
+                estatisticas.registrar_iteracao(profundidade, pontuacao, self.nos, time.time() - inicio)
+            self.informar_iteracao(profundidade, pontuacao, time.time() - inicio)
+            # Uma iteração custa mais que todas as anteriores juntas: não começa a que não vai terminar
+            if self.limites_pendentes is not None:
+                self._aplicar_limites_pendentes()
+            if self.prazo and time.time() - inicio > (self.prazo - inicio) / 2:
+                break
+            if self.limite_nos and self.nos > self.limite_nos / 2:
+                break
+            # O mate encontrado já é o mais curto ao alcance: mais profundidade não muda o lance
+            if abs(pontuacao) > LIMIAR_MATE:
+                break
+        self.interrompivel = False
+        if estatisticas is not None:
+            estatisticas.finalizar(self.nos, time.time() - inicio)
+        return resultado
+
+    def informar_iteracao(self, profundidade, pontuacao, tempo):
+        # Chamado ao fim de cada iteração completa, com a pontuação do ponto de vista de quem
+        # joga; as interfaces sobrescrevem para mostrar o progresso da busca
+        pass
+
+    def fator_ramificacao(self):
+        # Fator de ramificação efetivo da última busca
+        return fator_ramificacao_efetivo(self.nos_iteracoes)
+
+    def _preparar_busca(self):
+        # Zera os contadores e descarta os assassinos; o histórico só é atenuado
+        self.tabela_transposicao.nova_busca()
+        self.nos = 0
+        for assassinos in self.assassinos:
+            assassinos[0] = assassinos[1] = 0
+        for historico in self.tabela_historico:
+            for indice in range(4096):
+                historico[indice] >>= 1
+
+    def _ordenar_movimentos(self, movimentos, ply, movimento_tt=0, movimento_vp=0):
+        # Variação principal, movimento da tabela de transposição, capturas e promoções por
+        # MVV-LVA (vítima mais valiosa, atacante menos valioso, com os valores de valor_peca),
+        # assassinos do ply e, por fim, os movimentos quietos pela tabela de histórico
+        if not self.ordenar_movimentos:
+            for movimento in (movimento_tt, movimento_vp):
+                if movimento in movimentos:
+                    movimentos.remove(movimento)
+                    movimentos.insert(0, movimento)
+            return
+        casas = self.casas
+        assassinos = self.assassinos[ply]
+        historico = self.tabela_historico[self.lado]
+
+        def prioridade(movimento):
+            if movimento == movimento_vp:
+                return ORDEM_VP
+            if movimento == movimento_tt:
+                return ORDEM_TT
+            capturada = casas[(movimento >> 6) & 63]
+            if capturada != VAZIO or movimento >> 12:
+                vitima = VALOR_POR_TIPO[capturada % 6] if capturada != VAZIO else 0
+                if movimento >> 12:
+                    vitima += VALOR_POR_TIPO[movimento >> 12]
+                return ORDEM_CAPTURA + vitima * 1000 - VALOR_POR_TIPO[casas[movimento & 63] % 6]
+            if movimento == assassinos[0]:
+                return ORDEM_ASSASSINO + 1
+            if movimento == assassinos[1]:
+                return ORDEM_ASSASSINO
+            return historico[movimento & 4095]
+
+        movimentos.sort(key=prioridade, reverse=True)
+
+    def _registrar_corte(self, movimento, profundidade, ply):
+        # Um movimento quieto que causou corte beta vira assassino do ply e ganha histórico
+        if self.casas[(movimento >> 6) & 63] != VAZIO or movimento >> 12:
+            return
+        assassinos = self.assassinos[ply]
+        if assassinos[0] != movimento:
+            assassinos[1] = assassinos[0]
+            assassinos[0] = movimento
+        historico = self.tabela_historico[self.lado]
+        historico[movimento & 4095] += profundidade * profundidade
+        if historico[movimento & 4095] > LIMITE_HISTORICO:
+            for indice in range(4096):
+                historico[indice] >>= 1
+
+    def limitar_busca(self, prazo=None, limite_nos=None):
+        # Pode ser chamado de outra thread, antes ou durante a busca
+        with self.trava_limites:
+            self.limites_pendentes = (prazo, limite_nos)
+
+    def _aplicar_limites_pendentes(self):
+        with self.trava_limites:
+            if self.limites_pendentes is not None:
+                self.prazo, self.limite_nos = self.limites_pendentes
+                self.limites_pendentes = None
+
+    def _verificar_limites(self):
+        if self.limites_pendentes is not None:
+            self._aplicar_limites_pendentes()
+        if not self.interrompivel:
+            return
+        if self.parar:
+            raise BuscaInterrompida()
+        if (self.prazo and time.time() >= self.prazo) or (self.limite_nos and self.nos >= self.limite_nos):
+            raise BuscaInterrompida()
+
+    def _buscar_raiz(self, profundidade, anterior):
+        # Janela de aspiração: a iteração começa numa janela estreita em volta da pontuação da
+        # anterior e só a alarga, do lado que falhou e cada vez mais, quando o resultado cai fora
+        if not self.usar_aspiracao or anterior is None or abs(anterior) > LIMIAR_MATE:
+            self.seguindo_vp = True
+            return self._negamax(profundidade, -INFINITO, INFINITO, 0)
+        delta = JANELA_ASPIRACAO
+        alpha = anterior - delta
+        beta = anterior + delta
+        while True:
+            self.seguindo_vp = True
+            pontuacao = self._negamax(profundidade, alpha, beta, 0)
+            if pontuacao <= alpha:
+                alpha = max(pontuacao - delta, -INFINITO)
+            elif pontuacao >= beta:
+                beta = min(pontuacao + delta, INFINITO)
+            else:
+                return pontuacao
+            delta *= 2
+
+    def _material_final(self):
+        # Verdadeiro quando restam peças poucas o bastante para as tabelas de finais carregadas
+        return (self.ocupacao_cor[0] | self.ocupacao_cor[1]).bit_count() <= self.finais.pecas
+
+    def _variacao_tt(self, movimento, ply):
+        # Segue os melhores movimentos guardados na tabela a partir do nó, enquanto forem legais e
+        # sem repetir posição
+        variacao = []
+        vistas = set()
+        while (movimento and ply + len(variacao) < PROFUNDIDADE_MAXIMA and self.hash not in vistas
+               and movimento in self._movimentos_legais(self.lado)):
+            vistas.add(self.hash)
+            variacao.append(movimento)
+            self.fazer_movimento(movimento)
+            entrada = self.tabela_transposicao.consultar(self.hash)
+            movimento = entrada[3] if entrada else 0
+        for _ in variacao:
+            self.desfazer_movimento()
+        return tuple(variacao)
+
+    def _negamax(self, profundidade, alpha, beta, ply, permitir_nulo=True):
+        # Alpha-beta em forma negamax: a pontuação é do ponto de vista de quem joga
+        self.nos += 1
+        tabela_vp = self.tabela_vp
+        tabela_vp[ply] = ()
+        if not self.nos & 1023:
+            self._verificar_limites()
+        # Com poucas peças a tabela de finais dá a distância exata até o mate, em qualquer profundidade
+        estatisticas = self.estatisticas
+        if ply and self.finais is not None and self._material_final():
+            pontuacao = self.finais.consultar(self, ply)
+            if pontuacao is not None:
+                if estatisticas is not None:
+                    estatisticas.consultas_finais += 1
+                return pontuacao
+        if profundidade == 0:
+            if self.usar_quiescencia:
+                return self._quiescencia(alpha, beta, ply)
+            return self.avaliar_tabuleiro() if self.lado else -self.avaliar_tabuleiro()
+
+        # Posições já vistas (por transposição ou em buscas anteriores) podem encerrar o nó;
+        # na raiz a busca sempre acontece para que o melhor movimento seja conhecido
+        tabela = self.tabela_transposicao
+        entrada = tabela.consultar(self.hash)
+        if estatisticas is not None:
+            estatisticas.consultas_tt += 1
+            estatisticas.acertos_tt += entrada is not None
+        movimento_tt = 0
+        if entrada:
+            profundidade_tt, tipo, pontuacao_tt, movimento_tt = entrada
+            # Pontuações de mate são guardadas relativas ao nó e voltam relativas à raiz
+            if pontuacao_tt > LIMIAR_MATE:
+                pontuacao_tt -= ply
+            elif pontuacao_tt < -LIMIAR_MATE:
+                pontuacao_tt += ply
+            if ply and profundidade_tt >= profundidade and (
+                    tipo == EXATO or (tipo == LIMITE_INFERIOR and pontuacao_tt >= beta) or
+                    (tipo == LIMITE_SUPERIOR and pontuacao_tt <= alpha)):
+                if estatisticas is not None:
+                    estatisticas.cortes_tt += 1
+                if tipo == EXATO and beta - alpha > 1:
+                    # Num nó da variação principal o resto dela vem da tabela, senão a VP acabaria aqui
+                    tabela_vp[ply] = self._variacao_tt(movimento_tt, ply)
+                return pontuacao_tt
+
+        lado = self.lado
+        em_xeque = self.esta_em_xeque(CORES[lado])
+
+        # Movimento nulo: se mesmo passando a vez a posição ainda passa de beta numa busca rasa,
+        # o nó é cortado. Não vale em xeque, na variação principal, dois nulos seguidos nem
+        # quando só restam peões ao lado que joga (zugzwang é comum em finais de peões)
+        if (permitir_nulo and self.usar_movimento_nulo and ply and profundidade >= PROFUNDIDADE_NULO
+                and not em_xeque and beta - alpha == 1 and abs(beta) < LIMIAR_MATE
+                and self.ocupacao_cor[lado] & ~(self.bitboards[lado * 6 + PEAO] | self.bitboards[lado * 6 + REI])
+                and (self.avaliar_tabuleiro() if lado else -self.avaliar_tabuleiro()) >= beta):
+            reducao = 3 if profundidade >= 7 else 2
+            self.fazer_movimento_nulo()
+            pontuacao = -self._negamax(profundidade - 1 - reducao, -beta, -beta + 1, ply + 1, False)
+            self.desfazer_movimento_nulo()
+            if pontuacao >= beta:
+                if estatisticas is not None:
+                    estatisticas.cortes_nulo += 1
+                return beta
+
+        movimentos = self._movimentos_legais(lado)
+        if not movimentos:
+            # Fim de jogo sai da própria lista de movimentos do nó: xeque-mate ou afogamento
+            return -(VALOR_MATE - ply) if em_xeque else 0
+        # Enquanto a busca segue a variação principal da iteração anterior, o movimento dela
+        # vem primeiro, seguido do melhor movimento guardado para a posição
+        movimento_vp = 0
+        if self.seguindo_vp:
+            if ply < len(self.variacao_principal) and self.variacao_principal[ply] in movimentos:
+                movimento_vp = self.variacao_principal[ply]
+            else:
+                self.seguindo_vp = False
+        self._ordenar_movimentos(movimentos, ply, movimento_tt, movimento_vp)
+
+        alpha_original = alpha
+        melhor = -INFINITO
+        melhor_movimento = 0
+        casas = self.casas
+        assassinos = self.assassinos[ply]
+        reduzir = self.usar_reducoes and profundidade >= PROFUNDIDADE_REDUCAO and not em_xeque
+        usar_pvs = self.usar_pvs
+        for indice, movimento in enumerate(movimentos):
+            quieto = casas[(movimento >> 6) & 63] == VAZIO and not movimento >> 12
+            self.fazer_movimento(movimento)
+            reducao = 0
+            if (reduzir and indice >= LANCES_SEM_REDUCAO and quieto and movimento not in assassinos
+                    and not self.esta_em_xeque(CORES[lado ^ 1])):
+                # Lance quieto ordenado tarde: a prova de que ele não passa de alpha é feita mais rasa
+                reducao = 1 if indice < 2 * LANCES_SEM_REDUCAO else 2
+            if not indice or not (usar_pvs or reducao):
+                pontuacao = -self._negamax(profundidade - 1, -beta, -alpha, ply + 1)
+            else:
+                # PVS: depois do primeiro lance, os outros só precisam provar com janela nula que
+                # não passam de alpha; quem passar é buscado de novo (na profundidade cheia e, se
+                # ficar dentro da janela, com a janela inteira)
+                pontuacao = -self._negamax(profundidade - 1 - reducao, -alpha - 1, -alpha, ply + 1)
+                if pontuacao > alpha and reducao:
+                    pontuacao = -self._negamax(profundidade - 1, -alpha - 1, -alpha, ply + 1)
+                if alpha < pontuacao < beta:
+                    pontuacao = -self._negamax(profundidade - 1, -beta, -alpha, ply + 1)
+            self.desfazer_movimento()
+            # Só o primeiro filho de um nó da variação principal continua nela
+            self.seguindo_vp = False
+            if pontuacao > melhor:
+                melhor = pontuacao
+                melhor_movimento = movimento
+                if pontuacao > alpha:
+                    alpha = pontuacao
+                    tabela_vp[ply] = (movimento,) + tabela_vp[ply + 1]
+                    if alpha >= beta:
+                        self._registrar_corte(movimento, profundidade, ply)
+                        if estatisticas is not None:
+                            estatisticas.cortes += 1
+                            estatisticas.cortes_primeiro += not indice
+                        break
+
+        if melhor <= alpha_original:
+            tipo = LIMITE_SUPERIOR
+        elif melhor >= beta:
+            tipo = LIMITE_INFERIOR
+        else:
+            tipo = EXATO
+        if melhor > LIMIAR_MATE:
+            tabela.guardar(self.hash, profundidade, tipo, melhor + ply, melhor_movimento)
+        elif melhor < -LIMIAR_MATE:
+            tabela.guardar(self.hash, profundidade, tipo, melhor - ply, melhor_movimento)
+        else:
+            tabela.guardar(self.hash, profundidade, tipo, melhor, melhor_movimento)
+        if ply == 0:
+            self.melhor_movimento_raiz = melhor_movimento
+        return melhor
+
+    def _quiescencia(self, alpha, beta, ply):
+        # No horizonte a busca continua só com capturas e promoções até a posição ficar quieta,
+        # para não avaliar no meio de uma troca. Fora de xeque quem joga pode ficar com a
+        # avaliação estática (stand pat); em xeque todas as evasões são buscadas.
+        self.nos += 1
+        if not self.nos & 1023:
+            self._verificar_limites()
+        estatisticas = self.estatisticas
+        if estatisticas is not None:
+            estatisticas.nos_quiescencia += 1
+        if self.finais is not None and self._material_final():
+            pontuacao = self.finais.consultar(self, ply)
+            if pontuacao is not None:
+                if estatisticas is not None:
+                    estatisticas.consultas_finais += 1
+                return pontuacao
+        lado = self.lado
+        if self.esta_em_xeque(CORES[lado]):
+            movimentos = self._movimentos_legais(lado)
+            if not movimentos:
+                return -(VALOR_MATE - ply)
+            estatica = melhor = -INFINITO
+        else:
+            estatica = melhor = self.avaliar_tabuleiro() if lado else -self.avaliar_tabuleiro()
+            if estatica >= beta:
+                return estatica
+            if estatica > alpha:
+                alpha = estatica
+            movimentos = self._movimentos_legais(lado, apenas_capturas=True)
+        self._ordenar_movimentos(movimentos, min(ply, PROFUNDIDADE_MAXIMA))
+        casas = self.casas
+        for movimento in movimentos:
+            if estatica > -INFINITO:
+                capturada = casas[(movimento >> 6) & 63]
+                ganho = GANHO_CAPTURA[capturada % 6] if capturada != VAZIO else 0
+                if movimento >> 12:
+                    ganho += GANHO_CAPTURA[movimento >> 12] - GANHO_CAPTURA[PEAO]
+                if estatica + ganho + MARGEM_DELTA <= alpha:
+                    continue
+            self.fazer_movimento(movimento)
+            pontuacao = -self._quiescencia(-beta, -alpha, ply + 1)
+            self.desfazer_movimento()
+            if pontuacao > melhor:
+                melhor = pontuacao
+                if pontuacao > alpha:
+                    alpha = pontuacao
+                    if alpha >= beta:
+                        break
+        return melhor
+
+# Busca numa thread separada: quem chamou segue livre (a interface continua tratando eventos e
+# desenhando) e pode cancelar a qualquer momento pela bandeira parar do jogo. O jogo pertence à
+# busca enquanto ela roda: nada mais deve fazer ou desfazer movimentos nele.
+class BuscaEmSegundoPlano:
+    def __init__(self, jogo):
+        self.jogo = jogo
+        self.thread = None
+        self.resultado = None  # (pontuação, movimento) da última busca terminada
+
+    def iniciar(self, tempo_limite=None, limite_nos=None, profundidade_maxima=PROFUNDIDADE_MAXIMA):
+        self.cancelar()
+        self.jogo.parar = False
+        self.jogo.limites_pendentes = None  # Sem busca rodando: um limite antigo não vale para esta
+        self.resultado = None
+        self.thread = threading.Thread(target=self._executar, args=(tempo_limite, limite_nos, profundidade_maxima),
+                                       daemon=True)
+        self.thread.start()
+
+    def _executar(self, tempo_limite, limite_nos, profundidade_maxima):
+        self.resultado = self.jogo.busca_iterativa(tempo_limite, limite_nos, profundidade_maxima)
+
+    def em_andamento(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def limitar(self, prazo=None, limite_nos=None):
+        # Impõe limites a uma busca já em andamento (uma ponderação que acertou vira busca normal)
+        self.jogo.limitar_busca(prazo, limite_nos)
+
+    def cancelar(self):
+        # Para a busca e espera a thread terminar; devolve o resultado da última iteração completa
+        if self.thread is not None:
+            self.jogo.parar = True
+            self.thread.join()
+            self.thread = None
+        return self.resultado
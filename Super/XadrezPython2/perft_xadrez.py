@@ -0,0 +1,71 @@
+import argparse
+import sys
+import time
+
+from motor_xadrez import Jogo
+
+# Posições de referência com contagens publicadas. O jogo não tem roque nem en passant, então
+# só entram posições e profundidades em que nenhum dos dois aparece na árvore.
+POSICOES_PERFT = [
+    ('inicial', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     {1: 20, 2: 400, 3: 8902, 4: 197281}),
+    ('posição 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     {1: 14, 2: 191}),
+    ('promoções', 'n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1',
+     {1: 24, 2: 496, 3: 9483, 4: 182838}),
+    ('afogamento', 'K1k5/8/P7/8/8/8/8/8 w - - 0 1',
+     {6: 2217}),
+    ('dama e cavalo', '8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1',
+     {4: 23527}),
+    ('promoção com xeque', '8/P1k5/K7/8/8/8/8/8 w - - 0 1',
+     {6: 92683}),
+    ('promoção b7', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+     {6: 217342}),
+    ('promoção c7', '8/k1P5/8/1K6/8/8/8/8 w - - 0 1',
+     {7: 567584}),
+    ('dama contra peão', '8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1',
+     {5: 1004658}),
+]
+
+
+def executar_suite(limite_nos=0):
+    # Roda cada posição em cada profundidade cujo total esperado cabe no limite e mostra
+    # nós, tempo e nós por segundo; devolve True se todas as contagens conferem
+    tudo_certo = True
+    total_nos = total_tempo = 0
+    print(f'{"posição":<22}{"prof":>5}{"nós":>10}{"esperado":>10}{"tempo (s)":>11}{"nós/s":>10}')
+    for nome, fen, esperados in POSICOES_PERFT:
+        for profundidade, esperado in sorted(esperados.items()):
+            if limite_nos and esperado > limite_nos:
+                continue
+            jogo = Jogo()
+            jogo.carregar_fen(fen)
+            inicio = time.time()
+            nos = jogo.perft(profundidade)
+            tempo = time.time() - inicio
+            total_nos += nos
+            total_tempo += tempo
+            marca = '' if nos == esperado else '  <-- ERRO'
+            tudo_certo = tudo_certo and nos == esperado
+            print(f'{nome:<22}{profundidade:>5}{nos:>10}{esperado:>10}{tempo:>11.3f}'
+                  f'{nos / max(tempo, 1e-9):>10.0f}{marca}')
+    print(f'{"total":<22}{"":>5}{total_nos:>10}{"":>10}{total_tempo:>11.3f}{total_nos / max(total_tempo, 1e-9):>10.0f}')
+    return tudo_certo
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Perft do motor de xadrez: correção e velocidade do gerador')
+    argumentos.add_argument('--limite', type=int, default=0,
+                            help='pula profundidades com mais nós que isto (0 roda tudo)')
+    argumentos.add_argument('--divide', nargs=2, metavar=('FEN', 'PROFUNDIDADE'),
+                            help='mostra o perft de cada movimento da raiz da posição')
+    opcoes = argumentos.parse_args()
+    if opcoes.divide:
+        jogo = Jogo()
+        jogo.carregar_fen(opcoes.divide[0])
+        divisao = jogo.divide(int(opcoes.divide[1]))
+        for movimento, nos in sorted(divisao.items()):
+            print(f'{movimento}: {nos}')
+        print(f'total: {sum(divisao.values())}')
+    else:
+        sys.exit(0 if executar_suite(opcoes.limite) else 1)
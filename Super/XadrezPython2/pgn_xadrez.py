@@ -0,0 +1,150 @@
+import argparse
+import re
+import sys
+
+from motor_xadrez import Jogo, FEN_INICIAL
+
+# Fichas do texto de lances do PGN: comentários, variações, NAGs, números de lance e resultados
+# não são lances e são descartados
+RESULTADOS = ('1-0', '0-1', '1/2-1/2', '*')
+# Uma ficha por vez: comentário entre chaves (mesmo sem fechar), NAG e número de lance são
+# descartados; só parênteses (primeiro grupo) e lances ou resultados (segundo grupo) ficam
+_FICHA = re.compile(r'\{[^}]*\}?|\$\d*|\d+\.+|([()])|([^\s(){}$]+)')
+_CABECALHO = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+# Os sete cabeçalhos obrigatórios do PGN, nesta ordem
+CABECALHOS_PADRAO = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+LARGURA_LINHA = 79
+
+
+def _fichas(texto):
+    # Separa o texto de lances, pulando comentários {...}, variações (...) aninhadas, NAGs e
+    # números de lance; os comentários ;... já saem na leitura das linhas
+    if '(' not in texto:
+        return [lance for _, lance in _FICHA.findall(texto) if lance]
+    lances = []
+    nivel = 0
+    for parentese, lance in _FICHA.findall(texto):
+        if lance:
+            if not nivel:
+                lances.append(lance)
+        elif parentese == '(':
+            nivel += 1
+        elif parentese:
+            nivel = max(0, nivel - 1)
+    return lances
+
+
+def ler_pgn(arquivo):
+    # Gerador: lê o PGN linha a linha e devolve uma partida por vez como (cabeçalhos, lances SAN,
+    # resultado), sem carregar a coleção inteira na memória
+    cabecalhos = {}
+    texto = []
+    for linha in arquivo:
+        linha = linha.strip()
+        if not linha or linha.startswith('%'):
+            continue
+        encontrado = _CABECALHO.match(linha)
+        if not encontrado and ';' in linha:
+            linha = linha[:linha.index(';')].strip()
+            if not linha:
+                continue
+        if encontrado:
+            if texto:
+                # Cabeçalho depois de lances sem resultado: a partida anterior terminou
+                lances = _fichas(' '.join(texto))
+                yield cabecalhos, lances, '*'
+                cabecalhos = {}
+                texto = []
+            cabecalhos[encontrado.group(1)] = encontrado.group(2)
+            continue
+        texto.append(linha)
+        if linha.split()[-1] in RESULTADOS:
+            lances = _fichas(' '.join(texto))
+            resultado = lances.pop() if lances and lances[-1] in RESULTADOS else cabecalhos.get('Result', '*')
+            yield cabecalhos, lances, resultado
+            cabecalhos = {}
+            texto = []
+    if texto or cabecalhos:
+        lances = _fichas(' '.join(texto))
+        resultado = lances.pop() if lances and lances[-1] in RESULTADOS else cabecalhos.get('Result', '*')
+        yield cabecalhos, lances, resultado
+
+
+def texto_pgn(cabecalhos, lances_san, resultado='*', fen=FEN_INICIAL):
+    # Uma partida em PGN: os sete cabeçalhos obrigatórios (com '?' quando faltam), os demais, FEN e
+    # SetUp quando a partida não começa da posição inicial, e os lances numerados em linhas de até
+    # 79 caracteres
+    cabecalhos = dict(cabecalhos)
+    cabecalhos['Result'] = resultado
+    if fen != FEN_INICIAL:
+        cabecalhos['SetUp'] = '1'
+        cabecalhos['FEN'] = fen
+    nomes = list(CABECALHOS_PADRAO) + [nome for nome in cabecalhos if nome not in CABECALHOS_PADRAO]
+    linhas = [f'[{nome} "{cabecalhos.get(nome, "?")}"]' for nome in nomes]
+    linhas.append('')
+    campos = fen.split()
+    lado = 0 if len(campos) < 2 or campos[1] == 'w' else 1
+    numero = int(campos[5]) if len(campos) > 5 else 1
+    fichas = []
+    for indice, san in enumerate(lances_san):
+        if lado == 0:
+            fichas.append(f'{numero}.')
+        elif indice == 0:
+            fichas.append(f'{numero}...')
+        fichas.append(san)
+        numero += lado
+        lado ^= 1
+    fichas.append(resultado)
+    linha = ''
+    for ficha in fichas:
+        if linha and len(linha) + 1 + len(ficha) > LARGURA_LINHA:
+            linhas.append(linha)
+            linha = ficha
+        else:
+            linha = f'{linha} {ficha}' if linha else ficha
+    linhas.append(linha)
+    return '\n'.join(linhas) + '\n'
+
+
+def partida_pgn(jogo, cabecalhos=None, resultado='*'):
+    # A partida jogada com mover_peca desde a posição de partida do jogo
+    return texto_pgn(cabecalhos or {}, [san for _, san in jogo.lances_partida], resultado, jogo.fen_inicial)
+
+
+def posicoes_pgn(arquivo, maximo_lances=None):
+    # Gerador: cada posição das partidas do PGN como (FEN, lance SAN jogado nela, resultado da
+    # partida), lendo em fluxo como ler_pgn. Uma partida para no primeiro lance que o jogo não
+    # tem (roque, en passant) ou que não é legal.
+    jogo = Jogo(memoria_tt_mb=0)
+    for cabecalhos, lances, resultado in ler_pgn(arquivo):
+        jogo.carregar_fen(cabecalhos.get('FEN', FEN_INICIAL))
+        for san in lances[:maximo_lances]:
+            try:
+                movimento = jogo.movimento_san(san)
+            except ValueError:
+                break
+            yield jogo.gerar_fen(), san, resultado
+            jogo.fazer_movimento(movimento)
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Extrai as posições de partidas PGN, uma FEN por linha')
+    argumentos.add_argument('pgn', nargs='+', help='arquivos PGN (lidos em fluxo, de qualquer tamanho)')
+    argumentos.add_argument('-o', '--saida', help='arquivo de saída (padrão: saída padrão)')
+    argumentos.add_argument('--a-cada', type=int, default=1, help='grava uma posição a cada N')
+    argumentos.add_argument('--lances', type=int, default=None, help='meios-lances lidos de cada partida')
+    argumentos.add_argument('--lance-jogado', action='store_true',
+                            help='acrescenta o lance da partida como bm (formato EPD)')
+    opcoes = argumentos.parse_args()
+    saida = open(opcoes.saida, 'w', encoding='utf-8') if opcoes.saida else sys.stdout
+    contador = 0
+    for caminho in opcoes.pgn:
+        with open(caminho, encoding='utf-8', errors='replace') as arquivo:
+            for fen, san, _ in posicoes_pgn(arquivo, opcoes.lances):
+                contador += 1
+                if contador % opcoes.a_cada == 0:
+                    # EPD: os quatro primeiros campos da FEN e a operação bm com o lance da partida
+                    linha = ' '.join(fen.split()[:4]) + f' bm {san};' if opcoes.lance_jogado else fen
+                    saida.write(linha + '\n')
+    if opcoes.saida:
+        saida.close()
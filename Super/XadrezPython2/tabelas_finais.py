@@ -0,0 +1,247 @@
+import argparse
+import os
+import time
+
+from motor_xadrez import CAVALO, BISPO, TORRE, RAINHA, VALOR_MATE, ATAQUES_REI, ataques_peca
+
+# Tabelas de finais por análise retrógrada: para cada posição de um final sem peões em que um lado
+# só tem o rei, a distância até o mate em meios-lances, num byte por posição. O valor v > 0 quer
+# dizer que o lado mais forte dá mate em v - 1 meios-lances; 0 é empate (ou posição impossível).
+# Em todos os finais daqui, qualquer captura feita pelo rei sozinho deixa material insuficiente,
+# então ela termina em empate e não precisa de outra tabela.
+CONFIGURACOES = {
+    'KQK': (RAINHA,),
+    'KRK': (TORRE,),
+    'KBNK': (BISPO, CAVALO),
+    'KBBK': (BISPO, BISPO),
+}
+# As de 3 peças geram em segundos; as de 4 levam uns minutos e 5 MB cada, e são opcionais
+PADRAO = ('KQK', 'KRK')
+DIRETORIO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'finais')
+INVALIDA = 255  # Contador de uma posição do rei sozinho que não entra na análise (empate ou impossível)
+
+
+# Simetria: sem peões o tabuleiro pode ser espelhado nas duas direções e na diagonal, e cada
+# posição é guardada só na forma em que o rei sozinho está no triângulo a1-d1-d4 (10 casas)
+def _transformar(simetria, casa):
+    x, y = casa % 8, casa // 8
+    if simetria & 1:
+        x = 7 - x
+    if simetria & 2:
+        y = 7 - y
+    if simetria & 4:
+        x, y = y, x
+    return y * 8 + x
+
+TRANSFORMACOES = [[_transformar(simetria, casa) for casa in range(64)] for simetria in range(8)]
+TRIANGULO = [casa for casa in range(64) if casa % 8 <= 3 and 7 - casa // 8 <= casa % 8]
+INDICE_TRIANGULO = {casa: indice for indice, casa in enumerate(TRIANGULO)}
+# Com o rei sozinho na diagonal a1-h8 duas transformações o levam ao triângulo, e fica a de menor índice
+SIMETRIAS_REI = [[simetria for simetria in range(8) if TRANSFORMACOES[simetria][casa] in INDICE_TRIANGULO]
+                 for casa in range(64)]
+
+
+def indice_posicao(fraco, forte, pecas):
+    # Índice da posição na tabela: rei sozinho (no triângulo), rei forte e as peças, 6 bits cada
+    melhor = None
+    for simetria in SIMETRIAS_REI[fraco]:
+        transformacao = TRANSFORMACOES[simetria]
+        indice = INDICE_TRIANGULO[transformacao[fraco]] * 64 + transformacao[forte]
+        for casa in pecas:
+            indice = indice * 64 + transformacao[casa]
+        if melhor is None or indice < melhor:
+            melhor = indice
+    return melhor
+
+
+def posicao_indice(indice, quantidade):
+    pecas = []
+    for _ in range(quantidade):
+        pecas.append(indice & 63)
+        indice >>= 6
+    pecas.reverse()
+    return TRIANGULO[indice >> 6], indice & 63, pecas
+
+
+def _ataques(forte, tipos, pecas, ocupacao, ignorar=-1):
+    # Casas atacadas pelo lado forte (rei e peças), sem a peça de índice ignorar
+    ataques = ATAQUES_REI[forte]
+    for numero, (tipo, casa) in enumerate(zip(tipos, pecas)):
+        if numero != ignorar:
+            ataques |= ataques_peca(tipo, casa, ocupacao)
+    return ataques
+
+
+def _valida(fraco, forte, pecas):
+    casas = {fraco, forte, *pecas}
+    return len(casas) == len(pecas) + 2 and not ATAQUES_REI[forte] & (1 << fraco)
+
+
+def gerar_tabela(nome):
+    # Devolve (forte joga, fraco joga), dois bytearrays de 10 * 64^(peças + 1) posições
+    tipos = CONFIGURACOES[nome]
+    quantidade = len(tipos)
+    tamanho = len(TRIANGULO) * 64 ** (quantidade + 1)
+    forte_joga = bytearray(tamanho)
+    fraco_joga = bytearray(tamanho)
+    contadores = bytearray([INVALIDA]) * tamanho
+
+    # Posições com o rei sozinho para jogar: mates, e quantas posições distintas cada uma alcança.
+    # Quem pode capturar uma peça, ou está afogado, empata e fica de fora.
+    fila = []
+    for indice in range(tamanho):
+        fraco, forte, pecas = posicao_indice(indice, quantidade)
+        if not _valida(fraco, forte, pecas):
+            continue
+        ocupacao = (1 << forte) | (1 << fraco)
+        for casa in pecas:
+            ocupacao |= 1 << casa
+        sem_rei = ocupacao ^ (1 << fraco)
+        ataques = _ataques(forte, tipos, pecas, sem_rei)
+        filhos = set()
+        empate = False
+        destinos = ATAQUES_REI[fraco] & ~ataques & ~(1 << forte)
+        while destinos:
+            bit = destinos & -destinos
+            destinos ^= bit
+            destino = bit.bit_length() - 1
+            if destino in pecas:
+                # Captura: legal se nenhuma outra unidade forte defende a peça
+                if not _ataques(forte, tipos, pecas, sem_rei, pecas.index(destino)) & bit:
+                    empate = True
+                    break
+                continue
+            filhos.add(indice_posicao(destino, forte, pecas))
+        if empate:
+            continue
+        if filhos:
+            contadores[indice] = len(filhos)
+        elif _ataques(forte, tipos, pecas, ocupacao) & (1 << fraco):
+            fraco_joga[indice] = 1  # Xeque-mate
+            fila.append(indice)
+
+    # Para trás a partir dos mates: cada posição perdida do rei sozinho dá vitória a toda posição
+    # que chega nela com um lance do lado forte; uma posição do rei sozinho está perdida quando
+    # todas as que ela alcança são vitórias do forte, e a distância é a da última a ser resolvida
+    valor = 1
+    while fila:
+        proxima = []
+        for indice in fila:
+            fraco, forte, pecas = posicao_indice(indice, quantidade)
+            ocupacao = (1 << forte) | (1 << fraco)
+            for casa in pecas:
+                ocupacao |= 1 << casa
+            anteriores = []
+            origens = ATAQUES_REI[forte] & ~ocupacao & ~ATAQUES_REI[fraco]
+            while origens:
+                bit = origens & -origens
+                origens ^= bit
+                anteriores.append((bit.bit_length() - 1, pecas))
+            for numero, (tipo, casa) in enumerate(zip(tipos, pecas)):
+                origens = ataques_peca(tipo, casa, ocupacao) & ~ocupacao
+                while origens:
+                    bit = origens & -origens
+                    origens ^= bit
+                    anteriores.append((forte, pecas[:numero] + [bit.bit_length() - 1] + pecas[numero + 1:]))
+            for rei_forte, pecas_antes in anteriores:
+                # Com o forte para jogar, o rei sozinho não pode estar em xeque
+                ocupacao_antes = (1 << rei_forte) | (1 << fraco)
+                for casa in pecas_antes:
+                    ocupacao_antes |= 1 << casa
+                if _ataques(rei_forte, tipos, pecas_antes, ocupacao_antes) & (1 << fraco):
+                    continue
+                anterior = indice_posicao(fraco, rei_forte, pecas_antes)
+                if forte_joga[anterior]:
+                    continue
+                forte_joga[anterior] = valor + 1
+                # Posições do rei sozinho que chegam nesta com um lance dele
+                origens = ATAQUES_REI[fraco] & ~ocupacao_antes & ~ATAQUES_REI[rei_forte]
+                predecessoras = set()
+                while origens:
+                    bit = origens & -origens
+                    origens ^= bit
+                    predecessoras.add(indice_posicao(bit.bit_length() - 1, rei_forte, pecas_antes))
+                for predecessora in predecessoras:
+                    if contadores[predecessora] == INVALIDA or fraco_joga[predecessora]:
+                        continue
+                    contadores[predecessora] -= 1
+                    if not contadores[predecessora]:
+                        fraco_joga[predecessora] = valor + 2
+                        proxima.append(predecessora)
+        fila = proxima
+        valor += 2
+    return forte_joga, fraco_joga
+
+
+class TabelasFinais:
+    def __init__(self, diretorio=DIRETORIO_PADRAO):
+        # Carrega as tabelas que existirem no diretório (NOME.tb: forte joga e depois fraco joga)
+        self.tabelas = {}
+        self.pecas = 0  # Maior número de peças (reis incluídos) com tabela
+        for nome, tipos in CONFIGURACOES.items():
+            caminho = os.path.join(diretorio, nome + '.tb')
+            if os.path.exists(caminho):
+                with open(caminho, 'rb') as arquivo:
+                    dados = arquivo.read()
+                metade = len(dados) // 2
+                self.tabelas[tipos] = (dados[:metade], dados[metade:])
+                self.pecas = max(self.pecas, len(tipos) + 2)
+
+    def consultar(self, jogo, ply):
+        # Pontuação exata do ponto de vista de quem joga (mates relativos à raiz, como na busca),
+        # ou None quando a posição não está em nenhuma tabela
+        ocupacao_cor = jogo.ocupacao_cor
+        if ocupacao_cor[0] & (ocupacao_cor[0] - 1) == 0:
+            forte = 1
+        elif ocupacao_cor[1] & (ocupacao_cor[1] - 1) == 0:
+            forte = 0
+        else:
+            return None
+        bitboards = jogo.bitboards
+        base = forte * 6
+        if bitboards[base]:
+            return None  # Peões não entram nas tabelas
+        tipos = []
+        pecas = []
+        for tipo in (RAINHA, TORRE, BISPO, CAVALO):
+            bitboard = bitboards[base + tipo]
+            while bitboard:
+                bit = bitboard & -bitboard
+                bitboard ^= bit
+                tipos.append(tipo)
+                pecas.append(bit.bit_length() - 1)
+        tabela = self.tabelas.get(tuple(tipos))
+        if tabela is None:
+            return None
+        indice = indice_posicao(jogo.casa_rei[forte ^ 1], jogo.casa_rei[forte], pecas)
+        valor = tabela[0 if jogo.lado == forte else 1][indice]
+        if not valor:
+            return 0
+        pontuacao = VALOR_MATE - ply - (valor - 1)
+        return pontuacao if jogo.lado == forte else -pontuacao
+
+
+def gravar_tabela(nome, diretorio=DIRETORIO_PADRAO):
+    os.makedirs(diretorio, exist_ok=True)
+    forte_joga, fraco_joga = gerar_tabela(nome)
+    with open(os.path.join(diretorio, nome + '.tb'), 'wb') as arquivo:
+        arquivo.write(forte_joga)
+        arquivo.write(fraco_joga)
+    return forte_joga, fraco_joga
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(description='Gera as tabelas de finais do motor por análise retrógrada')
+    argumentos.add_argument('finais', nargs='*', help='finais a gerar, entre ' + ' '.join(CONFIGURACOES) +
+                            ' (padrão: ' + ' '.join(PADRAO) + ')')
+    argumentos.add_argument('-d', '--diretorio', default=DIRETORIO_PADRAO, help='diretório das tabelas')
+    opcoes = argumentos.parse_args()
+    for nome in opcoes.finais:
+        if nome not in CONFIGURACOES:
+            argumentos.error(f'final desconhecido: {nome}')
+    for nome in opcoes.finais or PADRAO:
+        inicio = time.time()
+        forte_joga, fraco_joga = gravar_tabela(nome, opcoes.diretorio)
+        vitorias = sum(1 for valor in forte_joga if valor)
+        print(f'{nome}: {len(forte_joga) + len(fraco_joga)} bytes, {vitorias} vitórias com o forte para jogar, '
+              f'mate mais longo em {max(forte_joga) // 2} lances, {time.time() - inicio:.1f} s')
@@ -0,0 +1,262 @@
+import argparse
+import ast
+import math
+import multiprocessing
+import os
+import random
+import time
+
+from motor_xadrez import Jogo, FEN_INICIAL, CORES, BISPO, CAVALO, PROFUNDIDADE_MAXIMA, codificar_movimento
+from livro_aberturas import LivroAberturas, LIVRO_PADRAO
+from tabelas_finais import TabelasFinais
+
+# Torneio do motor contra ele mesmo: duas configurações jogam partidas sem interface, em paralelo
+# num conjunto de processos, cada abertura sorteada duas vezes com as cores trocadas. O resultado
+# é o placar da configuração A, a diferença de Elo A - B com intervalo de confiança e os nós por
+# segundo de cada uma.
+
+# Controle padrão de cada lance; uma configuração pode trocar qualquer um deles
+CONTROLE_PADRAO = {'profundidade': 3, 'tempo': None, 'nos': None}
+MEMORIA_TT_MB = 4  # Tabela de transposição de cada motor em cada partida
+# Adjudicação: partidas que já estão decididas terminam sem ser jogadas até o fim
+RENDICAO_PONTOS = 800  # Os dois motores concordam que um lado está perdido por tanto...
+RENDICAO_LANCES = 4  # ...nos seus últimos tantos lances
+EMPATE_PONTOS = 15  # Os dois veem a posição igualada por tanto...
+EMPATE_LANCES = 8  # ...em tantos lances seguidos de cada lado...
+EMPATE_INICIO = 40  # ...depois deste número de lances da partida
+MAXIMO_LANCES = 200  # Lances da partida (de cada lado) antes do empate forçado
+Z_CONFIANCA = 1.96  # Intervalo de confiança de 95%
+
+
+def ler_configuracao(texto):
+    # "nome:chave=valor,chave=valor": profundidade, tempo e nos são o controle do lance e as demais
+    # chaves são atributos do Jogo (usar_pvs=False, usar_quiescencia=False...)
+    nome, _, opcoes = texto.partition(':')
+    controle = dict(CONTROLE_PADRAO)
+    atributos = {}
+    for opcao in filter(None, opcoes.split(',')):
+        chave, _, valor = opcao.partition('=')
+        try:
+            valor = ast.literal_eval(valor)
+        except (ValueError, SyntaxError):
+            pass
+        if chave in controle:
+            controle[chave] = valor
+        elif hasattr(Jogo(memoria_tt_mb=0), chave):
+            atributos[chave] = valor
+        else:
+            raise ValueError(f'Opção desconhecida na configuração {nome}: {chave}')
+    return {'nome': nome or texto, 'controle': controle, 'atributos': atributos}
+
+
+def sortear_abertura(sorteio, lances_aleatorios, livro=None):
+    # Lances do livro (sorteados pelo peso) enquanto houver, seguidos de lances legais aleatórios;
+    # aberturas que já terminam a partida são sorteadas de novo
+    while True:
+        jogo = Jogo(memoria_tt_mb=0)
+        movimentos = []
+        if livro is not None:
+            livro.sorteio = sorteio
+            movimento = livro.escolher(jogo)
+            while movimento:
+                movimentos.append(movimento)
+                jogo.fazer_movimento(movimento)
+                movimento = livro.escolher(jogo)
+        for _ in range(lances_aleatorios):
+            legais = jogo._movimentos_legais(jogo.lado)
+            if not legais:
+                break
+            movimento = sorteio.choice(legais)
+            movimentos.append(movimento)
+            jogo.fazer_movimento(movimento)
+        if jogo._movimentos_legais(jogo.lado):
+            return movimentos
+
+
+def material_insuficiente(jogo):
+    # Só os reis, ou um rei com um único cavalo ou bispo contra o rei
+    pecas = (jogo.ocupacao_cor[0] | jogo.ocupacao_cor[1]).bit_count()
+    if pecas == 2:
+        return True
+    if pecas == 3:
+        return any(jogo.bitboards[lado * 6 + tipo] for lado in (0, 1) for tipo in (BISPO, CAVALO))
+    return False
+
+
+_finais = {}  # Tabelas de finais carregadas uma vez em cada processo
+
+
+def carregar_finais():
+    if 'tabelas' not in _finais:
+        tabelas = TabelasFinais()
+        _finais['tabelas'] = tabelas if tabelas.tabelas else None
+    return _finais['tabelas']
+
+
+def criar_motor(configuracao, finais):
+    motor = Jogo(memoria_tt_mb=MEMORIA_TT_MB)
+    motor.finais = finais
+    for chave, valor in configuracao['atributos'].items():
+        setattr(motor, chave, valor)
+    return motor
+
+
+def jogar_partida(tarefa):
+    # Uma partida completa; devolve (índice, pontos de A, motivo, [nós, tempo] de A e de B)
+    indice, abertura, configuracoes, a_joga_com, usar_finais = tarefa
+    finais = carregar_finais() if usar_finais else None
+    # motores[lado]: o motor que joga com aquela cor
+    motores = [criar_motor(configuracao, finais) for configuracao in configuracoes]
+    if a_joga_com == 1:
+        motores.reverse()
+        configuracoes = configuracoes[::-1]
+    for motor in motores:
+        motor.carregar_fen(FEN_INICIAL)
+        for movimento in abertura:
+            motor.fazer_movimento(movimento)
+    jogo = motores[0]
+    estatisticas = [[0, 0.0], [0, 0.0]]  # Por lado
+    repeticoes = {}
+    perdendo = [0, 0]  # Lances seguidos em que cada lado se viu perdido
+    ganhando = [0, 0]  # Lances seguidos em que cada lado se viu ganhando
+    sequencia_empate = 0
+    resultado = None  # Pontos das brancas (azul)
+    motivo = ''
+    lances = 0
+    while resultado is None:
+        lado = jogo.lado
+        if not jogo._movimentos_legais(lado):
+            if jogo.esta_em_xeque(CORES[lado]):
+                resultado, motivo = (0.0 if lado == 0 else 1.0), 'mate'
+            else:
+                resultado, motivo = 0.5, 'afogamento'
+            break
+        repeticoes[jogo.hash] = repeticoes.get(jogo.hash, 0) + 1
+        if repeticoes[jogo.hash] >= 3:
+            resultado, motivo = 0.5, 'repetição'
+        elif jogo.lances_sem_captura >= 100:
+            resultado, motivo = 0.5, '50 lances'
+        elif material_insuficiente(jogo):
+            resultado, motivo = 0.5, 'material insuficiente'
+        elif lances >= 2 * MAXIMO_LANCES:
+            resultado, motivo = 0.5, 'limite de lances'
+        if resultado is not None:
+            break
+
+        motor = motores[lado]
+        controle = configuracoes[lado]['controle']
+        inicio = time.perf_counter()
+        pontuacao, movimento = motor.busca_iterativa(controle['tempo'], controle['nos'],
+                                                     controle['profundidade'] or PROFUNDIDADE_MAXIMA)
+        estatisticas[lado][0] += motor.nos
+        estatisticas[lado][1] += time.perf_counter() - inicio
+        # Pontuação do ponto de vista de quem joga (a busca devolve do ponto de vista do vermelho)
+        pontuacao = pontuacao if lado else -pontuacao
+
+        # Adjudicação: cada motor conta os próprios lances; vale quando os dois concordam
+        perdendo[lado] = perdendo[lado] + 1 if pontuacao <= -RENDICAO_PONTOS else 0
+        ganhando[lado] = ganhando[lado] + 1 if pontuacao >= RENDICAO_PONTOS else 0
+        for perdedor in (0, 1):
+            if perdendo[perdedor] >= RENDICAO_LANCES and ganhando[perdedor ^ 1] >= RENDICAO_LANCES:
+                resultado, motivo = (0.0 if perdedor == 0 else 1.0), 'adjudicação'
+        if resultado is not None:
+            break
+        sequencia_empate = sequencia_empate + 1 if abs(pontuacao) <= EMPATE_PONTOS else 0
+        if lances >= 2 * EMPATE_INICIO and sequencia_empate >= 2 * EMPATE_LANCES:
+            resultado, motivo = 0.5, 'adjudicação'
+            break
+
+        codigo = codificar_movimento(*movimento)
+        for motor in motores:
+            motor.fazer_movimento(codigo)
+        lances += 1
+    pontos_a = resultado if a_joga_com == 0 else 1.0 - resultado
+    return indice, pontos_a, motivo, estatisticas[a_joga_com], estatisticas[a_joga_com ^ 1]
+
+
+def diferenca_elo(pontuacao):
+    if pontuacao <= 0:
+        return -math.inf
+    if pontuacao >= 1:
+        return math.inf
+    return 400 * math.log10(pontuacao / (1 - pontuacao))
+
+
+def estimar_elo(vitorias, empates, derrotas):
+    # Diferença de Elo e intervalo de confiança a partir da média e do desvio padrão dos pontos
+    # por partida (aproximação normal)
+    partidas = vitorias + empates + derrotas
+    pontuacao = (vitorias + empates / 2) / partidas
+    variancia = (vitorias * (1 - pontuacao) ** 2 + empates * (0.5 - pontuacao) ** 2 +
+                 derrotas * pontuacao ** 2) / partidas
+    margem = Z_CONFIANCA * math.sqrt(variancia / partidas)
+    return (diferenca_elo(pontuacao), diferenca_elo(pontuacao - margem), diferenca_elo(pontuacao + margem))
+
+
+def torneio(configuracao_a, configuracao_b, partidas=100, processos=None, lances_aleatorios=6, usar_livro=False,
+            usar_finais=True, semente=0, mostrar=True):
+    sorteio = random.Random(semente)
+    livro = LivroAberturas(LIVRO_PADRAO) if usar_livro and os.path.exists(LIVRO_PADRAO) else None
+    tarefas = []
+    for indice in range(0, partidas, 2):
+        abertura = sortear_abertura(sorteio, lances_aleatorios, livro)
+        for a_joga_com in (0, 1)[:partidas - indice]:
+            tarefas.append((indice + a_joga_com, abertura, (configuracao_a, configuracao_b), a_joga_com, usar_finais))
+    if livro is not None:
+        livro.fechar()
+
+    placar = [0, 0, 0]  # Vitórias, empates e derrotas de A
+    motivos = {}
+    nos = [0, 0]
+    tempos = [0.0, 0.0]
+    inicio = time.time()
+    with multiprocessing.Pool(processos) as conjunto:
+        for jogadas, (_, pontos_a, motivo, estatisticas_a, estatisticas_b) in enumerate(
+                conjunto.imap_unordered(jogar_partida, tarefas), 1):
+            placar[0 if pontos_a == 1 else 1 if pontos_a == 0.5 else 2] += 1
+            motivos[motivo] = motivos.get(motivo, 0) + 1
+            nos[0] += estatisticas_a[0]
+            tempos[0] += estatisticas_a[1]
+            nos[1] += estatisticas_b[0]
+            tempos[1] += estatisticas_b[1]
+            if mostrar:
+                print(f'\r{jogadas}/{len(tarefas)} partidas  +{placar[0]} ={placar[1]} -{placar[2]}', end='', flush=True)
+    if mostrar:
+        print()
+    elo, minimo, maximo = estimar_elo(*placar)
+    resultado = {
+        'vitorias': placar[0], 'empates': placar[1], 'derrotas': placar[2],
+        'elo': elo, 'elo_minimo': minimo, 'elo_maximo': maximo, 'motivos': motivos,
+        'nps': [nos[lado] / tempos[lado] if tempos[lado] else 0.0 for lado in (0, 1)],
+        'tempo': time.time() - inicio,
+    }
+    if mostrar:
+        nome_a, nome_b = configuracao_a['nome'], configuracao_b['nome']
+        print(f'{nome_a} contra {nome_b}: +{placar[0]} ={placar[1]} -{placar[2]} em {sum(placar)} partidas '
+              f'({resultado["tempo"]:.1f} s)')
+        print(f'Elo {nome_a} - {nome_b}: {elo:+.1f} (IC 95%: {minimo:+.1f} a {maximo:+.1f})')
+        print('Fins de partida: ' + ', '.join(f'{motivo} {quantidade}' for motivo, quantidade in sorted(motivos.items())))
+        print(f'Nós por segundo: {nome_a} {resultado["nps"][0]:.0f}, {nome_b} {resultado["nps"][1]:.0f}')
+    return resultado
+
+
+if __name__ == '__main__':
+    argumentos = argparse.ArgumentParser(
+        description='Torneio do motor contra ele mesmo entre duas configurações, com estimativa de Elo',
+        epilog='Configuração: nome:chave=valor,... com profundidade, tempo (s por lance), nos, ou atributos '
+               'do Jogo. Ex.: "sem_pvs:usar_pvs=False,usar_aspiracao=False" ou "rapido:profundidade=None,tempo=0.1"')
+    argumentos.add_argument('a', help='configuração A (a avaliada)')
+    argumentos.add_argument('b', nargs='?', default='base', help='configuração B (a referência; padrão: base)')
+    argumentos.add_argument('-n', '--partidas', type=int, default=100)
+    argumentos.add_argument('-p', '--processos', type=int, default=None,
+                            help='processos do conjunto (padrão: um por núcleo)')
+    argumentos.add_argument('--profundidade', type=int, default=CONTROLE_PADRAO['profundidade'],
+                            help='profundidade padrão por lance das duas configurações')
+    argumentos.add_argument('--aleatorios', type=int, default=6, help='meios-lances aleatórios de cada abertura')
+    argumentos.add_argument('--livro', action='store_true', help='começa cada abertura pelo livro de aberturas')
+    argumentos.add_argument('--sem-finais', action='store_true', help='não consulta as tabelas de finais')
+    argumentos.add_argument('--semente', type=int, default=0)
+    opcoes = argumentos.parse_args()
+    CONTROLE_PADRAO['profundidade'] = opcoes.profundidade
+    torneio(ler_configuracao(opcoes.a), ler_configuracao(opcoes.b), opcoes.partidas, opcoes.processos,
+            opcoes.aleatorios, opcoes.livro, not opcoes.sem_finais, opcoes.semente)
@@ -0,0 +1,187 @@
+import os
+import sys
+import threading
+import time
+
+from motor_xadrez import (Jogo, TabelaTransposicao, FEN_INICIAL, LIMIAR_MATE, VALOR_MATE, MEMORIA_TT_PADRAO_MB,
+                          PROFUNDIDADE_MAXIMA, codificar_movimento, movimento_uci, decodificar_movimento)
+from livro_aberturas import LivroAberturas, LIVRO_PADRAO
+from tabelas_finais import TabelasFinais
+
+NOME_MOTOR = 'XadrezPython2'
+AUTOR_MOTOR = 'Luiz Tiago Wilcke'
+# Fração do relógio restante gasta num lance quando o gerenciador não informa movestogo
+LANCES_RESTANTES_PADRAO = 30
+# Margem descontada do tempo de cada lance para a comunicação com o gerenciador (segundos)
+MARGEM_TEMPO = 0.05
+
+
+def responder(texto):
+    # O gerenciador lê linha a linha: sem o flush a resposta fica presa no buffer do pipe
+    print(texto, flush=True)
+
+
+def texto_pontuacao(pontuacao):
+    # Centipeões do ponto de vista de quem joga, ou mate em lances inteiros (negativo quando leva)
+    if abs(pontuacao) > LIMIAR_MATE:
+        lances = (VALOR_MATE - abs(pontuacao) + 1) // 2
+        return f'mate {lances if pontuacao > 0 else -lances}'
+    return f'cp {pontuacao}'
+
+
+# Jogo que relata cada iteração do aprofundamento iterativo como uma linha info do UCI
+class JogoUCI(Jogo):
+    def informar_iteracao(self, profundidade, pontuacao, tempo):
+        variacao = ' '.join(movimento_uci(movimento) for movimento in self.variacao_principal)
+        responder(f'info depth {profundidade} score {texto_pontuacao(pontuacao)} nodes {self.nos} '
+                  f'nps {int(self.nos / max(tempo, 1e-6))} time {int(tempo * 1000)} pv {variacao}')
+
+
+class MotorUCI:
+    def __init__(self):
+        self.memoria_tt_mb = MEMORIA_TT_PADRAO_MB
+        self.jogo = JogoUCI(self.memoria_tt_mb)
+        self.livro = LivroAberturas(LIVRO_PADRAO) if os.path.exists(LIVRO_PADRAO) else None
+        self.jogo.livro = self.livro
+        finais = TabelasFinais()
+        self.jogo.finais = finais if finais.tabelas else None
+        self.busca = None  # Thread da busca em andamento
+        self.esperar_stop = threading.Event()  # Liberado por stop: go infinite só responde depois dele
+        self.limites_ponderacao = None  # (tempo, nós) do lance enquanto go ponder espera o ponderhit
+
+    def posicao(self, argumentos):
+        # position startpos|fen <campos> [moves <m1> <m2> ...]
+        if 'moves' in argumentos:
+            indice = argumentos.index('moves')
+            argumentos, lances = argumentos[:indice], argumentos[indice + 1:]
+        else:
+            lances = []
+        if argumentos and argumentos[0] == 'fen':
+            self.jogo.carregar_fen(' '.join(argumentos[1:]))
+        else:
+            self.jogo.carregar_fen(FEN_INICIAL)
+        for texto in lances:
+            legais = {movimento_uci(movimento): movimento for movimento in self.jogo._movimentos_legais(self.jogo.lado)}
+            if texto not in legais:
+                responder(f'info string movimento ilegal ignorado: {texto}')
+                break
+            self.jogo.mover_peca(*decodificar_movimento(legais[texto]))
+
+    def tempo_do_lance(self, opcoes):
+        # movetime manda; senão divide o relógio de quem joga pelos lances que faltam
+        if 'movetime' in opcoes:
+            return max(opcoes['movetime'] / 1000 - MARGEM_TEMPO, 0.001)
+        relogio, incremento = ('wtime', 'winc') if self.jogo.lado == 0 else ('btime', 'binc')
+        if relogio not in opcoes:
+            return None
+        restante = opcoes[relogio] / 1000
+        tempo = restante / opcoes.get('movestogo', LANCES_RESTANTES_PADRAO) + opcoes.get(incremento, 0) / 1000 * 0.8
+        return max(min(tempo, restante / 2) - MARGEM_TEMPO, 0.001)
+
+    def iniciar_busca(self, argumentos):
+        opcoes = {}
+        infinita = False
+        ponderar = False
+        indice = 0
+        while indice < len(argumentos):
+            nome = argumentos[indice]
+            if nome == 'infinite':
+                infinita = True
+            elif nome == 'ponder':
+                ponderar = True
+            elif nome in ('depth', 'movetime', 'nodes', 'wtime', 'btime', 'winc', 'binc', 'movestogo'):
+                indice += 1
+                opcoes[nome] = int(argumentos[indice])
+            indice += 1
+        tempo = None if infinita else self.tempo_do_lance(opcoes)
+        limite_nos = opcoes.get('nodes')
+        profundidade = min(opcoes.get('depth', PROFUNDIDADE_MAXIMA), PROFUNDIDADE_MAXIMA)
+        if ponderar:
+            # Ponderação: busca sem limite até o ponderhit (ou o stop) e guarda os limites do lance
+            self.limites_ponderacao = (tempo, limite_nos)
+            tempo = limite_nos = None
+            infinita = True
+        self.jogo.parar = False
+        self.jogo.limites_pendentes = None  # Sem busca rodando: um limite antigo não vale para esta
+        self.esperar_stop.clear()
+        self.busca = threading.Thread(target=self._buscar, args=(tempo, limite_nos, profundidade, infinita),
+                                      daemon=True)
+        self.busca.start()
+
+    def _buscar(self, tempo, limite_nos, profundidade, infinita):
+        _, melhor_movimento = self.jogo.busca_iterativa(tempo, limite_nos, profundidade)
+        if infinita:
+            # Em go infinite o bestmove só pode sair depois do stop, mesmo que a busca acabe antes
+            self.esperar_stop.wait()
+        if melhor_movimento:
+            responder(f'bestmove {movimento_uci(codificar_movimento(*melhor_movimento))}')
+        else:
+            responder('bestmove 0000')
+
+    def acertar_ponderacao(self):
+        # ponderhit: o adversário jogou o lance previsto e a ponderação vira a busca do lance, com o
+        # tempo contado a partir de agora (como BuscaEmSegundoPlano.limitar na interface)
+        if self.busca is None or self.limites_ponderacao is None:
+            return
+        tempo, limite_nos = self.limites_ponderacao
+        self.limites_ponderacao = None
+        self.jogo.limitar_busca(time.time() + tempo if tempo else None, limite_nos)
+        # O bestmove sai quando a busca terminar (na hora, se ela já terminou durante a ponderação)
+        self.esperar_stop.set()
+
+    def parar_busca(self):
+        self.limites_ponderacao = None
+        if self.busca:
+            self.jogo.parar = True
+            self.esperar_stop.set()
+            self.busca.join()
+            self.busca = None
+
+    def definir_opcao(self, argumentos):
+        # setoption name Hash value <MB> | setoption name OwnBook value true|false
+        if len(argumentos) < 4 or argumentos[2] != 'value':
+            return
+        if argumentos[1].lower() == 'hash':
+            self.memoria_tt_mb = max(1, int(argumentos[3]))
+            self.jogo.tabela_transposicao = TabelaTransposicao(self.memoria_tt_mb)
+        elif argumentos[1].lower() == 'ownbook':
+            self.jogo.livro = self.livro if argumentos[3].lower() == 'true' else None
+
+    def executar(self, entrada=sys.stdin):
+        for linha in entrada:
+            partes = linha.split()
+            if not partes:
+                continue
+            comando, argumentos = partes[0], partes[1:]
+            if comando == 'uci':
+                responder(f'id name {NOME_MOTOR}')
+                responder(f'id author {AUTOR_MOTOR}')
+                responder(f'option name Hash type spin default {MEMORIA_TT_PADRAO_MB} min 1 max 1024')
+                responder(f'option name OwnBook type check default {"true" if self.livro else "false"}')
+                responder('option name Ponder type check default false')
+                responder('uciok')
+            elif comando == 'isready':
+                responder('readyok')
+            elif comando == 'setoption':
+                self.parar_busca()
+                self.definir_opcao(argumentos)
+            elif comando == 'ucinewgame':
+                self.parar_busca()
+                self.jogo.tabela_transposicao.limpar()
+            elif comando == 'position':
+                self.parar_busca()
+                self.posicao(argumentos)
+            elif comando == 'go':
+                self.parar_busca()
+                self.iniciar_busca(argumentos)
+            elif comando == 'ponderhit':
+                self.acertar_ponderacao()
+            elif comando == 'stop':
+                self.parar_busca()
+            elif comando == 'quit':
+                break
+        self.parar_busca()
+
+
+if __name__ == '__main__':
+    MotorUCI().executar()
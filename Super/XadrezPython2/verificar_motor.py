@@ -0,0 +1,302 @@
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from motor_xadrez import Jogo, decodificar_movimento, FEN_INICIAL, RAINHA, VAZIO, VALOR_MATE, CORES
+from tabelas_finais import TabelasFinais, gravar_tabela
+from pgn_xadrez import ler_pgn, partida_pgn
+from analise_epd import analisar_arquivos
+
+# Pontos de partida dos passeios aleatórios do gerador legal: abertura, meio-jogo carregado de
+# cravadas, finais com promoções e uma posição em xeque duplo
+POSICOES_INICIAIS = [
+    FEN_INICIAL,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+    'n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1',
+    '4r1k1/8/8/8/8/3n4/8/4K3 w - - 0 1',
+]
+
+# Tempo máximo para importar o motor num interpretador novo (segundos). Hoje fica perto de 0,05 s;
+# a folga cobre máquinas mais lentas, mas uma tabela pré-calculada cara no import estoura o limite
+ORCAMENTO_IMPORTACAO = 0.25
+
+# Mate mais longo de cada final com o lado forte para jogar, em lances (valores conhecidos)
+MATE_MAIS_LONGO = {'KQK': 10, 'KRK': 16}
+
+# Lote da análise EPD com linhas que não são posições no meio: (linha, erro esperado, lance esperado)
+LOTE_EPD = [
+    ('6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - bm Ra8#; id "mate";', False, 'a1a8'),
+    ('this is not a fen', True, ''),
+    ('8/8/8/8/8/8/8/8 w - - 0 1', True, ''),
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1', True, ''),
+    ('6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1', False, 'a1a8'),
+]
+
+# Roda num processo separado: mede o import a frio e confere que o pygame não foi carregado
+_CODIGO_IMPORTACAO = '''
+import sys, time
+inicio = time.perf_counter()
+import motor_xadrez
+print(time.perf_counter() - inicio, 'pygame' in sys.modules)
+'''
+
+
+def verificar_importacao(orcamento=ORCAMENTO_IMPORTACAO, tentativas=3):
+    # O núcleo precisa ser importável sem interface gráfica e rápido de carregar; usa o
+    # melhor de algumas tentativas para não falhar por ruído da máquina
+    melhor = None
+    for _ in range(tentativas):
+        saida = subprocess.run([sys.executable, '-c', _CODIGO_IMPORTACAO], capture_output=True, text=True,
+                               check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        if saida[1] == 'True':
+            raise AssertionError('Importar motor_xadrez carregou o pygame')
+        tempo = float(saida[0])
+        melhor = tempo if melhor is None else min(melhor, tempo)
+    if melhor > orcamento:
+        raise AssertionError(f'Importar motor_xadrez levou {melhor:.3f} s (orçamento {orcamento:.3f} s)')
+    return melhor
+
+
+def estado_motor(jogo):
+    # Tudo o que fazer_movimento altera, em forma comparável
+    return (tuple(jogo.bitboards), tuple(jogo.ocupacao_cor), tuple(jogo.casas), jogo.direitos_roque,
+            jogo.lances_sem_captura, jogo.contador_lances, jogo.lado, jogo.hash, jogo.avaliacao_mg,
+            jogo.avaliacao_eg, jogo.fase, len(jogo.pilha_desfazer))
+
+
+def verificar_fazer_desfazer(partidas=20, lances=200, semente=0):
+    # Passeio aleatório: em cada posição, todo movimento legal é feito e desfeito e o estado
+    # precisa voltar bit a bit ao que era, com a chave de Zobrist e as somas da avaliação
+    # incrementais iguais às recalculadas;
+    # no fim o passeio inteiro é desfeito até o início
+    gerador = random.Random(semente)
+    posicoes = 0
+    for _ in range(partidas):
+        jogo = Jogo()
+        inicial = estado_motor(jogo)
+        for _ in range(lances):
+            antes = estado_motor(jogo)
+            legais = jogo._movimentos_legais(jogo.lado)
+            for movimento in legais:
+                jogo.fazer_movimento(movimento)
+                jogo.desfazer_movimento()
+                if estado_motor(jogo) != antes:
+                    raise AssertionError(f'Estado alterado ao desfazer o movimento {movimento}')
+            posicoes += 1
+            if not legais:
+                break
+            jogo.fazer_movimento(gerador.choice(legais))
+            if jogo.hash != jogo.calcular_hash():
+                raise AssertionError('Chave de Zobrist incremental diverge da recalculada')
+            if (jogo.avaliacao_mg, jogo.avaliacao_eg, jogo.fase) != jogo.calcular_avaliacao():
+                raise AssertionError('Avaliação incremental diverge da recalculada')
+        while jogo.pilha_desfazer:
+            jogo.desfazer_movimento()
+        if estado_motor(jogo) != inicial:
+            raise AssertionError('Estado alterado ao desfazer o passeio completo')
+    return posicoes
+
+
+def _em_xeque_referencia(tabuleiro, cor):
+    # Xeque pelo método original: alguma peça adversária alcança o rei com movimentos_validos
+    for y in range(8):
+        for x in range(8):
+            peca = tabuleiro[y][x]
+            if peca and peca.tipo == 'rei' and peca.cor == cor:
+                rei = (x, y)
+    for y in range(8):
+        for x in range(8):
+            peca = tabuleiro[y][x]
+            if peca and peca.cor != cor and rei in peca.movimentos_validos(x, y, tabuleiro, None):
+                return True
+    return False
+
+
+def _movimentos_referencia(tabuleiro, cor):
+    # Gerador original: Peca.movimentos_validos casa a casa, cada movimento testado numa cópia
+    movimentos = set()
+    for y in range(8):
+        for x in range(8):
+            peca = tabuleiro[y][x]
+            if peca and peca.cor == cor:
+                for destino in peca.movimentos_validos(x, y, tabuleiro, None):
+                    copia = [linha[:] for linha in tabuleiro]
+                    copia[destino[1]][destino[0]] = peca
+                    copia[y][x] = None
+                    if not _em_xeque_referencia(copia, cor):
+                        movimentos.add(((x, y), destino))
+    return movimentos
+
+
+def verificar_gerador_legal(partidas=30, lances=150, semente=0):
+    # Compara o gerador legal com cravadas com o gerador original e com o pseudo-legal filtrado,
+    # em posições de partidas aleatórias que preferem lances de xeque (para aparecerem xeques
+    # duplos, cravadas e evasões com frequência)
+    gerador = random.Random(semente)
+    posicoes = 0
+    for partida in range(partidas):
+        jogo = Jogo()
+        jogo.carregar_fen(POSICOES_INICIAIS[partida % len(POSICOES_INICIAIS)])
+        for _ in range(lances):
+            cor = jogo.jogador_atual
+            legais = jogo._movimentos_legais(jogo.lado)
+            filtrados = [movimento for movimento in jogo._gerar_movimentos(jogo.lado)
+                         if jogo._movimento_legal(movimento, jogo.lado)]
+            if sorted(legais) != sorted(filtrados):
+                raise AssertionError(f'Gerador legal diverge do pseudo-legal filtrado: {set(legais) ^ set(filtrados)}')
+            # Capturas sem promoção e qualquer promoção a rainha (com ou sem captura)
+            capturas = [movimento for movimento in legais if movimento >> 12 == RAINHA or
+                        (not movimento >> 12 and jogo.casas[(movimento >> 6) & 63] != VAZIO)]
+            if sorted(jogo._movimentos_legais(jogo.lado, apenas_capturas=True)) != sorted(capturas):
+                raise AssertionError('Gerador de capturas da quiescência diverge do gerador legal')
+            pares = {decodificar_movimento(movimento)[:2] for movimento in legais}
+            referencia = _movimentos_referencia(jogo.tabuleiro, cor)
+            if pares != referencia:
+                raise AssertionError(f'Gerador legal diverge do original: {pares ^ referencia}')
+            if jogo.esta_em_xeque(cor) != _em_xeque_referencia(jogo.tabuleiro, cor):
+                raise AssertionError('Detecção de xeque diverge da original')
+            posicoes += 1
+            if not legais:
+                break
+            xeques = []
+            for movimento in legais:
+                jogo.fazer_movimento(movimento)
+                if jogo.esta_em_xeque(jogo.jogador_atual):
+                    xeques.append(movimento)
+                jogo.desfazer_movimento()
+            escolhido = gerador.choice(xeques if xeques and gerador.random() < 0.5 else legais)
+            jogo.mover_peca(*decodificar_movimento(escolhido))
+    return posicoes
+
+
+def verificar_san_pgn(partidas=12, lances=120, semente=0):
+    # SAN de ida e volta para todos os lances legais de posições de partidas aleatórias, e cada
+    # partida exportada em PGN, lida de volta e rejogada até a mesma posição final
+    gerador = random.Random(semente)
+    posicoes = 0
+    for partida in range(partidas):
+        jogo = Jogo(memoria_tt_mb=0)
+        jogo.carregar_fen(POSICOES_INICIAIS[partida % len(POSICOES_INICIAIS)])
+        for _ in range(lances):
+            legais = jogo._movimentos_legais(jogo.lado)
+            if not legais:
+                break
+            notacoes = set()
+            for movimento in legais:
+                san = jogo.san_movimento(movimento)
+                if jogo.movimento_san(san) != movimento:
+                    raise AssertionError(f'SAN {san} não volta ao mesmo lance em {jogo.gerar_fen()}')
+                notacoes.add(san)
+            if len(notacoes) != len(legais):
+                raise AssertionError(f'Dois lances com a mesma SAN em {jogo.gerar_fen()}')
+            posicoes += 1
+            jogo.mover_peca(*decodificar_movimento(gerador.choice(legais)))
+        texto = partida_pgn(jogo, {'Event': 'verificação'})
+        cabecalhos, lances_san, resultado = next(ler_pgn(io.StringIO(texto)))
+        releitura = Jogo(memoria_tt_mb=0)
+        releitura.carregar_fen(cabecalhos.get('FEN', FEN_INICIAL))
+        for san in lances_san:
+            releitura.fazer_movimento(releitura.movimento_san(san))
+        if releitura.gerar_fen() != jogo.gerar_fen() or lances_san != [san for _, san in jogo.lances_partida]:
+            raise AssertionError(f'PGN exportado não reproduz a partida:\n{texto}')
+    return posicoes
+
+
+def _fen_final(casas, lado):
+    # FEN de uma posição dada como {casa: letra}, casa = y * 8 + x com y = 0 na linha 8
+    linhas = []
+    for y in range(8):
+        linha = ''
+        vazias = 0
+        for x in range(8):
+            letra = casas.get(y * 8 + x)
+            if letra is None:
+                vazias += 1
+                continue
+            if vazias:
+                linha += str(vazias)
+            linha += letra
+            vazias = 0
+        linhas.append(linha + (str(vazias) if vazias else ''))
+    return '/'.join(linhas) + (' w' if lado == 0 else ' b') + ' - - 0 1'
+
+
+def verificar_tabelas_finais(amostras=3000, semente=0):
+    # Gera as tabelas de 3 peças, confere o mate mais longo e, em posições aleatórias, que o valor
+    # de cada uma é o melhor entre os das posições seguintes (mais um meio-lance), com os lances
+    # do próprio gerador legal do motor
+    gerador = random.Random(semente)
+    posicoes = 0
+    with tempfile.TemporaryDirectory() as diretorio:
+        for nome, lances in MATE_MAIS_LONGO.items():
+            forte_joga, _ = gravar_tabela(nome, diretorio)
+            if max(forte_joga) // 2 != lances:
+                raise AssertionError(f'{nome}: mate mais longo em {max(forte_joga) // 2} lances, esperado {lances}')
+        tabelas = TabelasFinais(diretorio)
+    jogo = Jogo(memoria_tt_mb=0)
+    while posicoes < amostras:
+        nome = gerador.choice(list(MATE_MAIS_LONGO))
+        forte = gerador.randrange(2)
+        letras = ['K', nome[1]] if forte == 0 else ['k', nome[1].lower()]
+        letras.append('k' if forte == 0 else 'K')
+        casas = gerador.sample(range(64), 3)
+        lado = gerador.randrange(2)
+        jogo.carregar_fen(_fen_final(dict(zip(casas, letras)), lado))
+        # Reis vizinhos ou quem não joga em xeque são posições impossíveis
+        if abs(casas[0] % 8 - casas[2] % 8) <= 1 and abs(casas[0] // 8 - casas[2] // 8) <= 1:
+            continue
+        if jogo.esta_em_xeque(CORES[jogo.lado ^ 1]):
+            continue
+        pontuacao = tabelas.consultar(jogo, 0)
+        legais = jogo._movimentos_legais(jogo.lado)
+        if not legais:
+            esperada = -VALOR_MATE if jogo.esta_em_xeque(jogo.jogador_atual) else 0
+        else:
+            esperada = None
+            for movimento in legais:
+                jogo.fazer_movimento(movimento)
+                seguinte = tabelas.consultar(jogo, 1)
+                jogo.desfazer_movimento()
+                # Depois da captura da peça só restam os reis: empate
+                valor = -(seguinte or 0)
+                esperada = valor if esperada is None else max(esperada, valor)
+        if pontuacao != esperada:
+            raise AssertionError(f'{nome}: tabela dá {pontuacao} em {jogo.gerar_fen()}, esperado {esperada}')
+        posicoes += 1
+    return posicoes
+
+
+def verificar_analise_epd():
+    # Uma linha que não é posição vira um registro com erro, sem derrubar o lote: as posições
+    # válidas antes e depois dela continuam sendo analisadas
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'lote.epd')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('\n'.join(linha for linha, _, _ in LOTE_EPD) + '\n')
+        saida = io.StringIO()
+        resumo = analisar_arquivos([caminho], saida, 'json', profundidade=2, processos=1, usar_finais=False)
+    registros = [json.loads(linha) for linha in saida.getvalue().splitlines()]
+    if len(registros) != len(LOTE_EPD):
+        raise AssertionError(f'análise EPD: {len(registros)} registros para {len(LOTE_EPD)} linhas')
+    for registro, (linha, com_erro, lance) in zip(registros, LOTE_EPD):
+        if bool(registro['erro']) != com_erro or registro['lance'] != lance:
+            raise AssertionError(f'análise EPD: {linha} deu {registro}')
+    if resumo['erros'] != sum(com_erro for _, com_erro, _ in LOTE_EPD) or resumo['resolvidas'] != 1:
+        raise AssertionError(f'análise EPD: resumo {resumo}')
+    return len(registros)
+
+
+if __name__ == '__main__':
+    semente = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    print(f'importação do motor: {verificar_importacao():.3f} s')
+    print(f'fazer/desfazer: {verificar_fazer_desfazer(semente=semente)} posições verificadas')
+    print(f'gerador legal: {verificar_gerador_legal(semente=semente)} posições verificadas')
+    print(f'SAN e PGN: {verificar_san_pgn(semente=semente)} posições verificadas')
+    print(f'tabelas de finais: {verificar_tabelas_finais(semente=semente)} posições verificadas')
+    print(f'análise EPD: {verificar_analise_epd()} linhas verificadas')